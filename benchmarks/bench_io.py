@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pytest
+import feilian
+
+FORMATS = ['csv', 'tsv', 'jsonl', 'json', 'parquet', 'feather', 'xlsx']
+
+def _skip_slow(file_format: str, rows: int):
+    # excel is slow, and has a limit of rows
+    if file_format == 'xlsx' and rows > 100_000:
+        pytest.skip("too many rows for xlsx")
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_save_dataframe(measure, frame, rows, tmp_path, file_format):
+    _skip_slow(file_format, rows)
+    file = str(tmp_path / f'data.{file_format}')
+    measure(feilian.save_dataframe, file, frame)
+
+@pytest.mark.parametrize('file_format', FORMATS)
+def test_read_dataframe(measure, frame, rows, tmp_path, file_format):
+    _skip_slow(file_format, rows)
+    file = str(tmp_path / f'data.{file_format}')
+    feilian.save_dataframe(file, frame)
+    df = measure(feilian.read_dataframe, file)
+    assert len(df) == rows
+
+@pytest.mark.parametrize('file_format', ['csv', 'jsonl', 'parquet'])
+def test_iter_read_dataframe(measure, frame, rows, tmp_path, file_format):
+    file = str(tmp_path / f'data.{file_format}')
+    feilian.save_dataframe(file, frame)
+    measure(lambda: sum(len(x) for x in feilian.iter_read_dataframe(file, chunksize=100_000)))
+
+@pytest.mark.parametrize('jsonl', [False, True])
+def test_save_json(measure, records, tmp_path, jsonl):
+    file = str(tmp_path / ('data.jsonl' if jsonl else 'data.json'))
+    measure(feilian.save_json, file, records, jsonl=jsonl)
+
+@pytest.mark.parametrize('jsonl', [False, True])
+def test_read_json(measure, records, rows, tmp_path, jsonl):
+    file = str(tmp_path / ('data.jsonl' if jsonl else 'data.json'))
+    feilian.save_json(file, records, jsonl=jsonl)
+    assert len(measure(feilian.read_json, file)) == rows
+    assert os.path.getsize(file) > 0
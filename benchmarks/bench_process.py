@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+import pytest
+import feilian
+from data import make_nested_dict
+
+@pytest.mark.parametrize('engine', ['python', 'vectorized'])
+def test_merge_dataframe_rows(measure, frame, rows, engine):
+    if engine == 'python' and rows > 1_000_000:
+        pytest.skip("too slow for the python engine")
+    df = frame[['id', 'category', 'text']].astype(str)
+    measure(feilian.merge_dataframe_rows, df, col_id='id', join_sep=',', engine=engine)
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_extract_dataframe_sample(measure, frame, vectorized):
+    if vectorized:
+        filter_func = lambda df: df['count'] > 500
+    else:
+        filter_func = lambda row: row['count'] > 500
+    measure(feilian.extract_dataframe_sample, frame, filter_func, size=1000, vectorized=vectorized, random_state=0)
+
+def test_is_blank_text(measure, frame):
+    measure(feilian.is_blank_text, frame['text'])
+
+class _RowProcessor(feilian.DataframeProcessor):
+    def process_row(self, i, row):
+        return {'id': row['id'], 'score': row['score'] * 2}
+
+class _BatchProcessor(feilian.DataframeProcessor):
+    def process_batch(self, data: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame({'id': data['id'], 'score': data['score'] * 2})
+
+@pytest.mark.parametrize('processor', ['row', 'batch', 'streaming'])
+def test_processor_run(measure, frame, tmp_path, processor):
+    input_file = str(tmp_path / 'input.csv')
+    output_file = str(tmp_path / 'output.csv')
+    feilian.save_dataframe(input_file, frame)
+    if processor == 'row':
+        measure(_RowProcessor(row_format='dict').run, input_file, output_file)
+    elif processor == 'batch':
+        measure(_BatchProcessor().run, input_file, output_file)
+    else:
+        measure(_BatchProcessor().run, input_file, output_file, streaming=True, chunksize=100_000)
+
+def test_flatten_dict(measure, rows):
+    data = make_nested_dict(rows)
+    measure(feilian.flatten_dict, data, n=rows)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare two benchmark results saved by `pytest benchmarks --benchmark-json=xx.json`,
+exit with code 1 if any benchmark is slower or uses more memory than the threshold.
+"""
+
+from typing import Any, Dict, List
+import sys
+import json
+import argparse
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {x['fullname']: x for x in data['benchmarks']}
+
+def _format_bytes(n) -> str:
+    if n is None:
+        return '-'
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.1f}{unit}"
+        n /= 1024
+
+def _ratio(old, new):
+    if not old or new is None:
+        return None
+    return new / old - 1
+
+def compare(base: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]],
+            threshold=0.1, memory_threshold=0.1) -> List[str]:
+    """
+    Print a table of the changes.
+    :return:    names of benchmarks regressed
+    """
+    regressed = []
+    width = max([len(x) for x in new] + [9])
+    print(f"{'benchmark':<{width}}  {'base':>10}  {'new':>10}  {'change':>8}  {'rows/s':>12}  "
+          f"{'peak mem':>10}  {'change':>8}")
+    for name, result in new.items():
+        median = result['stats']['median']
+        rows = result.get('extra_info', {}).get('rows')
+        memory = result.get('extra_info', {}).get('peak_memory')
+        old = base.get(name)
+        old_median = old['stats']['median'] if old else None
+        old_memory = old.get('extra_info', {}).get('peak_memory') if old else None
+        time_change = _ratio(old_median, median)
+        memory_change = _ratio(old_memory, memory)
+        flags = []
+        if time_change is not None and time_change > threshold:
+            flags.append('SLOWER')
+        if memory_change is not None and memory_change > memory_threshold:
+            flags.append('MORE MEMORY')
+        if flags:
+            regressed.append(name)
+        cells = [
+            '-' if old_median is None else f"{old_median:.4f}s",
+            f"{median:.4f}s",
+            '-' if time_change is None else f"{time_change:+.1%}",
+            f"{rows / median:,.0f}" if rows else '-',
+            _format_bytes(memory),
+            '-' if memory_change is None else f"{memory_change:+.1%}",
+        ]
+        print(f"{name:<{width}}  {cells[0]:>10}  {cells[1]:>10}  {cells[2]:>8}  {cells[3]:>12}  "
+              f"{cells[4]:>10}  {cells[5]:>8}  {' '.join(flags)}")
+    for name in base:
+        if name not in new:
+            print(f"{name:<{width}}  missing in new results")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base', help="results of the base commit")
+    parser.add_argument('new', help="results of the new commit")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="flag a benchmark if its median time increases more than this ratio")
+    parser.add_argument('--memory-threshold', type=float, default=0.1,
+                        help="flag a benchmark if its peak memory increases more than this ratio")
+    args = parser.parse_args(argv)
+    regressed = compare(load_results(args.base), load_results(args.new),
+                        threshold=args.threshold, memory_threshold=args.memory_threshold)
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed.")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
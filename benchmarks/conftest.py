@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import gc
+import tracemalloc
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.dirname(__file__))
+from data import parse_size, make_dataframe, make_records
+
+def pytest_addoption(parser):
+    group = parser.getgroup('feilian benchmark')
+    group.addoption('--rows', default='10k', help="rows of the synthetic data: 10k, 1m, 10m, or a number")
+    group.addoption('--rounds', type=int, default=3, help="rounds to run every benchmark")
+
+def pytest_collect_file(file_path, parent):
+    # named `bench_*.py`, so that they don't clash with modules of the same name in `tests/`
+    if file_path.suffix == '.py' and file_path.name.startswith('bench_'):
+        return pytest.Module.from_parent(parent, path=file_path)
+
+@pytest.fixture(scope='session')
+def rows(request) -> int:
+    return parse_size(request.config.getoption('--rows'))
+
+@pytest.fixture(scope='session')
+def frame(rows):
+    return make_dataframe(rows)
+
+@pytest.fixture(scope='session')
+def records(rows):
+    return make_records(rows)
+
+@pytest.fixture
+def measure(benchmark, request, rows):
+    """
+    Benchmark a function, its peak memory traced in an extra run and the rows are saved as extra info.
+    The last result is returned.
+    """
+    rounds = request.config.getoption('--rounds')
+
+    def run(func, *args, setup=None, n=None, **kwargs):
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info['rows'] = rows if n is None else n
+        benchmark.extra_info['peak_memory'] = peak
+
+        def prepare():
+            # called before every round, not timed
+            if setup:
+                setup()
+            return args, kwargs
+
+        return benchmark.pedantic(func, setup=prepare, rounds=rounds, iterations=1)
+
+    return run
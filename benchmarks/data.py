@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic data for benchmarks, same seed always generates same data.
+"""
+
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+def parse_size(size: str) -> int:
+    if size.lower() in SIZES:
+        return SIZES[size.lower()]
+    return int(size)
+
+def make_dataframe(rows: int, seed=0) -> pd.DataFrame:
+    """
+    A frame with common column types: ids with duplicates, ints, floats with na, and strings.
+    """
+    rng = np.random.default_rng(seed)
+    floats = rng.random(rows)
+    floats[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'id': rng.integers(0, max(rows // 4, 1), rows),
+        'count': rng.integers(0, 1000, rows),
+        'score': floats,
+        'category': rng.choice(['a', 'b', 'c', 'd', 'e'], rows),
+        'text': pd.Series(rng.integers(0, 1 << 40, rows)).map('text-{:x}'.format),
+    })
+
+def make_records(rows: int, seed=0) -> List[Dict[str, Any]]:
+    return make_dataframe(rows, seed=seed).to_dict('records')
+
+def make_nested_dict(keys: int, depth=3, seed=0) -> Dict[str, Any]:
+    """
+    A nested dict with about `keys` leaf values.
+    """
+    rng = np.random.default_rng(seed)
+    width = max(int(round(keys ** (1 / depth))), 1)
+
+    def build(level: int) -> Dict[str, Any]:
+        if level == depth:
+            return {f"k{i}": int(x) for i, x in enumerate(rng.integers(0, 100, width))}
+        return {f"k{i}": build(level + 1) for i in range(width)}
+
+    return build(1)
@@ -1,25 +1,33 @@
 # -*- coding: utf-8 -*-
 
 from .io import ensure_parent_dir_exist
-from .dataframe import read_dataframe, save_dataframe, extract_dataframe_sample, merge_dataframe_rows, iter_dataframe
+from .dataframe import read_dataframe, iter_read_dataframe, save_dataframe, DataframeWriter, extract_dataframe_sample, merge_dataframe_rows, iter_dataframe
+from .dataframe import optimize_dataframe
 from .dataframe import is_empty_text, is_nonempty_text, is_blank_text, is_non_blank_text
 from .datetime import format_time, format_date
 from .arg import ArgValueParser
-from .json import read_json, save_json
-from .process import DataframeProcessor
+from .json import read_json, save_json, iter_json, JsonlWriter
+from .json import JsonBackend, register_json_backend, set_json_backend, get_json_backend
+from .process import DataframeProcessor, AsyncDataframeProcessor
+from .instrument import Instrumentation, RunReport, StageReport, LatencyReport, LoggingSink, JsonFileSink
 from .excel import save_excel
+from .cache import set_dataframe_cache, clear_dataframe_cache
 from .utils import flatten_dict, flatten_list
 from .version import __version__
 
 __all__ = [
     'ensure_parent_dir_exist',
-    'read_dataframe', 'save_dataframe', 'extract_dataframe_sample', 'merge_dataframe_rows', 'iter_dataframe',
+    'read_dataframe', 'iter_read_dataframe', 'save_dataframe', 'DataframeWriter', 'extract_dataframe_sample', 'merge_dataframe_rows', 'iter_dataframe',
+    'optimize_dataframe',
     'is_empty_text', 'is_nonempty_text', 'is_blank_text', 'is_non_blank_text',
     'format_time', 'format_date',
     'ArgValueParser',
-    'read_json', 'save_json',
+    'read_json', 'save_json', 'iter_json', 'JsonlWriter',
+    'JsonBackend', 'register_json_backend', 'set_json_backend', 'get_json_backend',
     'save_excel',
-    'DataframeProcessor',
+    'set_dataframe_cache', 'clear_dataframe_cache',
+    'DataframeProcessor', 'AsyncDataframeProcessor',
+    'Instrumentation', 'RunReport', 'StageReport', 'LatencyReport', 'LoggingSink', 'JsonFileSink',
     'flatten_dict', 'flatten_list',
     '__version__',
 ]
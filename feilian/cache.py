@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-disk cache for parsed dataframes, used by `read_dataframe(cache=True)`.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Union
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import pandas as pd
+
+_cache_dir: Optional[str] = None
+# max total bytes of the cache, the least recently used entries are removed when exceeded
+_max_cache_size = 2 * 1024 ** 3
+
+def set_dataframe_cache(cache_dir: str = None, max_size: int = None):
+    """
+    Set default options of the dataframe cache.
+    :param cache_dir:   where to store the cache, `$FEILIAN_CACHE_DIR` or `~/.cache/feilian/dataframe` if not set
+    :param max_size:    max total bytes of the cache
+    """
+    global _cache_dir, _max_cache_size
+    if cache_dir is not None:
+        _cache_dir = cache_dir
+    if max_size is not None:
+        _max_cache_size = max_size
+
+def _get_cache_dir(cache_dir: str = None) -> str:
+    return cache_dir or _cache_dir or os.environ.get('FEILIAN_CACHE_DIR') \
+        or os.path.join(os.path.expanduser('~'), '.cache', 'feilian', 'dataframe')
+
+def _hash_path(filepath: str) -> str:
+    return hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()[:16]
+
+def _hash_content(filepath: str) -> str:
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _cache_key(filepath: str, args: Sequence[Any], options: Dict[str, Any], content=False) -> str:
+    """
+    Key of the file and the read args, entries of a file all start with the hash of its path.
+    :param content:     identify the file by its content hash, instead of its size and modified time
+    """
+    stat = os.stat(filepath)
+    fingerprint = _hash_content(filepath) if content else [stat.st_size, stat.st_mtime_ns]
+    data = [os.path.abspath(filepath), fingerprint, list(args), options]
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+    return f"{_hash_path(filepath)}-{digest[:32]}"
+
+def _entry_files(cache_dir: str, prefix=''):
+    if not os.path.isdir(cache_dir):
+        return []
+    return [os.path.join(cache_dir, x) for x in os.listdir(cache_dir)
+            if x.startswith(prefix) and x.endswith(('.feather', '.pkl'))]
+
+def _load(key: str, cache_dir: str = None) -> Union[pd.DataFrame, Dict[str, pd.DataFrame], None]:
+    cache_dir = _get_cache_dir(cache_dir)
+    for ext in ['.feather', '.pkl']:
+        path = os.path.join(cache_dir, key + ext)
+        try:
+            if ext == '.feather':
+                import pyarrow.feather as feather
+                data = feather.read_table(path, memory_map=True).to_pandas()
+            else:
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+        except (FileNotFoundError, ImportError):
+            continue
+        # refresh the modified time, so that the entry is recently used
+        os.utime(path)
+        return data
+    return None
+
+def _to_arrow(data):
+    """
+    Convert to an arrow table to save as feather, `None` if not supported.
+    """
+    # column names are saved as strings in feather
+    if not isinstance(data, pd.DataFrame) or not all(isinstance(x, str) for x in data.columns):
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    try:
+        return pa.Table.from_pandas(data)
+    except pa.ArrowException:
+        # such as mixed types in an object column
+        return None
+
+def _store(key: str, data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], cache_dir: str = None):
+    cache_dir = _get_cache_dir(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    table = _to_arrow(data)
+    ext = '.pkl' if table is None else '.feather'
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if table is None:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                import pyarrow.feather as feather
+                feather.write_feather(table, f, compression='uncompressed')
+        # other processes never see a partial entry
+        os.replace(tmp, os.path.join(cache_dir, key + ext))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _evict(cache_dir)
+
+def _evict(cache_dir: str, max_size: int = None):
+    max_size = _max_cache_size if max_size is None else max_size
+    entries = []
+    for path in _entry_files(cache_dir):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(x[1] for x in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def clear_dataframe_cache(filepath: str = None, cache_dir: str = None):
+    """
+    Remove cached dataframes.
+    :param filepath:    only remove the entries of this file, all entries if not set
+    :param cache_dir:   the cache dir, see `set_dataframe_cache()`
+    """
+    prefix = _hash_path(filepath) + '-' if filepath else ''
+    for path in _entry_files(_get_cache_dir(cache_dir), prefix):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Checkpoints of streaming processor runs, see `DataframeProcessor.run(checkpoint_dir=...)`.
+"""
+
+from typing import Any, Dict, Iterable, List
+import os
+import pandas as pd
+from .io import atomic_path
+from .json import read_json, save_json
+
+_STATE_FILE = 'state.json'
+
+def _input_signature(files: List[str]) -> List[List[Any]]:
+    """
+    Identify input files by path, size and modified time, so that changed inputs are not resumed.
+    """
+    res = []
+    for x in files:
+        stat = os.stat(x)
+        res.append([os.path.abspath(x), stat.st_size, stat.st_mtime_ns])
+    return res
+
+class Checkpoint(object):
+    """
+    Results of processed chunks and the input offset, saved in a directory:
+        part-000000.pkl ...     results of chunks, in the order of input
+        state.json              the run config, number of chunks and rows done, finished or not
+    """
+
+    def __init__(self, dirname: str, config: Dict[str, Any]):
+        """
+        :param dirname:     the checkpoint directory
+        :param config:      identify the run, a checkpoint of another config can't be resumed
+        """
+        self.dirname = dirname
+        self.config = config
+        self.chunks = 0         # chunks of input done
+        self.rows = 0           # rows of input done
+        self.finished = False   # output has been written or not
+
+    @property
+    def state_file(self) -> str:
+        return os.path.join(self.dirname, _STATE_FILE)
+
+    def _part_file(self, i: int) -> str:
+        return os.path.join(self.dirname, f"part-{i:06d}.pkl")
+
+    def _save_state(self):
+        save_json(self.state_file, {
+            'config': self.config,
+            'chunks': self.chunks,
+            'rows': self.rows,
+            'finished': self.finished,
+        })
+
+    def load(self) -> bool:
+        """
+        Load the state to resume the run.
+        :return:    `False` if no checkpoint to resume
+        """
+        if not os.path.exists(self.state_file):
+            return False
+        state = read_json(self.state_file)
+        if state['config'] != self.config:
+            raise ValueError(f"Checkpoint in {self.dirname} is created by another run, "
+                             f"input files or args are changed, resume it with `resume=False`.")
+        self.chunks = state['chunks']
+        self.rows = state['rows']
+        self.finished = state['finished']
+        return True
+
+    def reset(self):
+        """
+        Remove results of the previous run, then start from the beginning.
+        """
+        os.makedirs(self.dirname, exist_ok=True)
+        self._remove_parts()
+        self.chunks = self.rows = 0
+        self.finished = False
+        self._save_state()
+
+    def _remove_parts(self):
+        for x in os.listdir(self.dirname):
+            if x.startswith('part-') and x.endswith('.pkl'):
+                os.remove(os.path.join(self.dirname, x))
+
+    def add(self, result: pd.DataFrame, rows: int):
+        """
+        Save result of a chunk, then move the input offset forward.
+        :param rows:    rows of the input chunk
+        """
+        with atomic_path(self._part_file(self.chunks)) as tmp:
+            result.to_pickle(tmp)
+        self.chunks += 1
+        self.rows += rows
+        # the state is updated after the part is saved, so that it never refers to a missing part
+        self._save_state()
+
+    def iter_results(self) -> Iterable[pd.DataFrame]:
+        for i in range(self.chunks):
+            yield pd.read_pickle(self._part_file(i))
+
+    def finish(self):
+        """
+        Mark the run as finished after the output is written, results of chunks are removed.
+        """
+        self.finished = True
+        self._save_state()
+        self._remove_parts()
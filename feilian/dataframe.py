@@ -11,10 +11,28 @@
     from typing_extensions import Literal
 
 import os
+import re
+import numpy as np
 import pandas as pd
 import random
+import datetime
+import itertools
+import urllib.parse
+import warnings
+import contextlib
 import collections
-from .io import ensure_parent_dir_exist
+from .io import (
+    ensure_parent_dir_exist,
+    atomic_path,
+    open_file,
+    detect_compression,
+    infer_compression,
+    strip_compression_extension,
+    sniff_file_format,
+    sniff_delimiter,
+)
+from .json import iter_json, JsonBackend, _sniff_json, _NOTHING
+from .cache import _cache_key, _load as _load_cache, _store as _store_cache
 
 # Compatible with different pandas versions
 PD_PARAM_NEWLINE = 'lineterminator'
@@ -22,8 +40,8 @@
 if pd_version[0] < 1 or (pd_version[0] == 1 and pd_version[1] < 5):
     PD_PARAM_NEWLINE = 'line_terminator'
 
-FILE_FORMAT = Literal['csv', 'tsv', 'json', 'xlsx', 'parquet']
-COMPRESSION_FORMAT = Literal[None, 'infer', 'snappy', 'gzip', 'brotli', 'bz2', 'zip', 'xz']
+FILE_FORMAT = Literal['csv', 'tsv', 'json', 'xlsx', 'parquet', 'feather', 'arrow']
+COMPRESSION_FORMAT = Literal[None, 'infer', 'snappy', 'gzip', 'brotli', 'bz2', 'zip', 'xz', 'lz4', 'zstd']
 
 def _drop_na_values(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], axis: Literal['columns', 'rows']):
     if isinstance(data, pd.DataFrame):
@@ -33,33 +51,58 @@ def _drop_na_values(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], axis: Li
         for df in data.values():
             df.dropna(axis=axis, how='all', inplace=True)
 
-def read_dataframe(file: str, *args, sheet_name=0,
-                   file_format: FILE_FORMAT = None,
-                   jsonl=False, dtype: type = None,
-                   drop_na_columns=False, drop_na_rows=False,
-                   **kwargs) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+_READ_FORMATS = {'csv', 'tsv', 'json', 'jsonl', 'xlsx', 'parquet', 'feather', 'arrow'}
+
+def _normalize_read_format(file, file_format, jsonl, kwargs: Dict[str, Any]) -> Tuple[str, bool]:
     """
-    read file as pandas `DataFrame`
-    :param file:        the file to be read
-    :param args:        extra args for `pd.read_xx()`
-    :param sheet_name:      `sheet_name` for `pd.read_excel()`
-    :param file_format:     csv, tsv, json ,xlsx, parquet
-    :param jsonl:       jsonl format or not, only used in json format
-    :param dtype:       `dtype` for `pd.read_xx()`
-    :param drop_na_columns:     drop column if all values of the column is na
-    :param drop_na_rows:        drop row if all values of the row is na
-    :param kwargs:      extra kwargs for `pd.read_xx()`
+    Decide the actual file format, and adjust `kwargs` for special formats.
+    For a local file, the content is sniffed, so that a misleading extension is accepted.
     """
+    sniffable = isinstance(file, (str, os.PathLike)) and os.path.isfile(file)
+    # delimiter expected by the extension, empty if the format is sniffed,
+    # `None` if the format is given, which is never changed
+    expected_delimiter = None
+
     # decide the file format
     if not file_format:
-        if not isinstance(file, str):
+        if not isinstance(file, (str, os.PathLike)):
             raise ValueError("Format should given!")
-        file_format = os.path.splitext(file)[1].lower()[1:]
+        file_format = os.path.splitext(strip_compression_extension(os.fspath(file)))[1].lower()[1:]
+        if file_format in ['csv', 'tsv']:
+            expected_delimiter = '\t' if file_format == 'tsv' else ','
+        elif file_format not in _READ_FORMATS and sniffable:
+            file_format = sniff_file_format(file) or file_format
+            expected_delimiter = ''
 
     for key in ['lines', 'line_delimited_json_format']:
         if key in kwargs and kwargs.pop(key):
             jsonl = True
 
+    if sniffable and file_format in ['csv', 'tsv', 'json', 'jsonl']:
+        if 'compression' not in kwargs:
+            compression = detect_compression(file)
+            if compression:
+                kwargs['compression'] = compression
+        encoding = kwargs.get('encoding') or 'utf-8'
+        if file_format in ['csv', 'tsv'] and expected_delimiter is not None \
+                and 'sep' not in kwargs and 'delimiter' not in kwargs:
+            # only switch if the expected delimiter doesn't appear in the header, and another one is consistent
+            delimiter = sniff_delimiter(file, candidates=[',', '\t'], encoding=encoding,
+                                        preferred=expected_delimiter)
+            if delimiter:
+                file_format = 'tsv' if delimiter == '\t' else 'csv'
+        elif file_format in ['json', 'jsonl']:
+            sniffed, value = _sniff_json(file, encoding=encoding)
+            if sniffed is None and value is not _NOTHING:
+                # a single value in one line, it's a record of jsonl if values are all scalars,
+                # otherwise a dataframe saved as json, such as orient 'columns', 'index' and 'split'
+                if isinstance(value, dict):
+                    sniffed = not any(isinstance(x, (dict, list)) for x in value.values())
+                elif isinstance(value, list):
+                    sniffed = False
+            if sniffed is not None:
+                file_format, jsonl = 'json', sniffed
+
     # handle special formats
     if file_format == 'tsv':
         # if the file format is tsv, actually same as csv
@@ -70,32 +113,772 @@ def read_dataframe(file: str, *args, sheet_name=0,
     elif file_format == 'jsonl':
         file_format = 'json'
         jsonl = True
+    elif file_format == 'arrow':
+        # feather v2 is the arrow ipc file format
+        file_format = 'feather'
+
+    return file_format, jsonl
+
+def _optimize_column(s: pd.Series, category_threshold: float, downcast_float: bool, arrow_strings: bool) -> pd.Series:
+    dtype = s.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return s
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        if len(s) == 0:
+            return s
+        return pd.to_numeric(s, downcast='unsigned' if s.min() >= 0 else 'integer')
+    if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        return pd.to_numeric(s, downcast='float') if downcast_float else s
+    if pd.api.types.is_string_dtype(dtype) and pd.api.types.infer_dtype(s, skipna=True) == 'string':
+        n = s.count()
+        if n > 0 and s.nunique() <= n * category_threshold:
+            return s.astype('category')
+        if arrow_strings and dtype == object:
+            return s.astype('string[pyarrow]')
+    return s
+
+def optimize_dataframe(df: pd.DataFrame, category_threshold=0.5, downcast_float=False,
+                       arrow_strings=False, inplace=False) -> pd.DataFrame:
+    """
+    Reduce memory usage of a dataframe by converting columns to smaller dtypes.
+    Bytes saved is recorded in `df.attrs['memory_saved']`.
+    :param df:                  the dataframe
+    :param category_threshold:  convert a string column to category if its unique values are no more than
+                                this ratio of its non-na values
+    :param downcast_float:      downcast float64 to float32, may lose precision
+    :param arrow_strings:       convert other string columns to pyarrow backed strings
+    :param inplace:             modify the dataframe in place or return a new one
+    """
+    before = df.memory_usage(deep=True).sum()
+    columns = {}
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        optimized = _optimize_column(column, category_threshold=category_threshold,
+                                     downcast_float=downcast_float, arrow_strings=arrow_strings)
+        if optimized is not column:
+            columns[i] = optimized
+    if not inplace:
+        df = df.copy(deep=False)
+    for i, column in columns.items():
+        df.isetitem(i, column)
+    df.attrs['memory_saved'] = int(before - df.memory_usage(deep=True).sum())
+    return df
+
+def _post_process(df: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+                  drop_na_columns=False, drop_na_rows=False,
+                  optimize_dtypes: Union[bool, Dict[str, Any]] = False) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    if drop_na_columns:
+        _drop_na_values(df, axis='columns')
+    if drop_na_rows:
+        _drop_na_values(df, axis='rows')
+    if optimize_dtypes:
+        kwargs = optimize_dtypes if isinstance(optimize_dtypes, dict) else {}
+        if isinstance(df, pd.DataFrame):
+            optimize_dataframe(df, inplace=True, **kwargs)
+        else:
+            for x in df.values():
+                optimize_dataframe(x, inplace=True, **kwargs)
+    return df
+
+# a filter is a tuple `(column, op, value)`, a list of filters are joined with AND,
+# and a list of such lists are joined with OR, same as `filters` of `pd.read_parquet()`
+FILTER = Tuple[Hashable, str, Any]
+FILTERS = Union[List[FILTER], List[List[FILTER]]]
+
+_FILTER_OPS = {
+    '=': lambda s, v: s == v,
+    '==': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(v),
+    'not in': lambda s, v: ~s.isin(v),
+}
+
+def _normalize_filters(filters: FILTERS) -> List[List[FILTER]]:
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple):
+        filters = [filters]
+    for conjunction in filters:
+        for _, op, _ in conjunction:
+            if op not in _FILTER_OPS:
+                raise ValueError(f"Unknown filter operator: {op}")
+    return filters
+
+def _read_columns(columns: Sequence[Hashable] = None, filters: FILTERS = None) -> Union[List[Hashable], None]:
+    """
+    Columns need to read from the file, including the ones only used by filters.
+    """
+    if columns is None:
+        return None
+    columns = list(columns)
+    for conjunction in _normalize_filters(filters):
+        for col, _, _ in conjunction:
+            if col not in columns:
+                columns.append(col)
+    return columns
+
+def _filters_to_mask(df: pd.DataFrame, filters: FILTERS) -> pd.Series:
+    mask = pd.Series(False, index=df.index)
+    for conjunction in _normalize_filters(filters):
+        m = pd.Series(True, index=df.index)
+        for col, op, value in conjunction:
+            m &= _FILTER_OPS[op](df[col], value).fillna(False).astype(bool)
+        mask |= m
+    return mask
+
+def _select_rows_columns(df: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+                         columns: Sequence[Hashable] = None,
+                         filters: FILTERS = None) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    if not isinstance(df, pd.DataFrame):
+        return {k: _select_rows_columns(v, columns=columns, filters=filters) for k, v in df.items()}
+    if filters:
+        df = df[_filters_to_mask(df, filters)]
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+def _json_records_to_dataframe(records: Iterable[Dict[str, Any]], dtype=None,
+                               columns: Sequence[Hashable] = None) -> pd.DataFrame:
+    if columns is not None:
+        # drop other fields before creating the dataframe
+        records = ({k: r[k] for k in columns if k in r} for r in records)
+        df = pd.DataFrame(records, columns=columns)
+    else:
+        df = pd.DataFrame(records)
+    if dtype is not None and not isinstance(dtype, bool):
+        df = df.astype(dtype)
+    return df
+
+def _iter_json_chunks(file, chunksize: int, backend: Union[str, JsonBackend], dtype=None,
+                      columns: Sequence[Hashable] = None) -> Iterable[pd.DataFrame]:
+    records = iter_json(file, jsonl=True, backend=backend)
+    offset = 0
+    while True:
+        chunk = list(itertools.islice(records, chunksize))
+        if not chunk:
+            break
+        df = _json_records_to_dataframe(chunk, dtype=dtype, columns=columns)
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        offset += len(df)
+        yield df
+
+def _pyarrow_installed() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _calamine_installed() -> bool:
+    try:
+        import python_calamine  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _check_engine(kwargs: Dict[str, Any]) -> Union[str, None]:
+    """
+    Return the engine set in `kwargs`, drop it if it's pyarrow or calamine but not installed.
+    """
+    engine = kwargs.get('engine')
+    if engine is None:
+        kwargs.pop('engine', None)
+    elif engine == 'pyarrow' and not _pyarrow_installed():
+        warnings.warn("pyarrow is not installed, fall back to the default engine.")
+        kwargs.pop('engine')
+        return None
+    elif engine == 'calamine' and not _calamine_installed():
+        warnings.warn("python-calamine is not installed, fall back to the default engine.")
+        kwargs.pop('engine')
+        return None
+    return engine
+
+def _read_csv(file, *args, **kwargs) -> pd.DataFrame:
+    if kwargs.get('engine') == 'pyarrow':
+        try:
+            return pd.read_csv(file, *args, **kwargs)
+        except ValueError as e:
+            if "not supported with the 'pyarrow' engine" not in str(e):
+                raise
+            warnings.warn(f"{e}, fall back to the default engine.")
+            kwargs.pop('engine')
+    return pd.read_csv(file, *args, **kwargs)
+
+def _read_jsonl_pyarrow(file, dtype=None, columns: Sequence[Hashable] = None,
+                        compression=None, dtype_backend=None) -> pd.DataFrame:
+    import pyarrow.json as pa_json
+    if isinstance(file, (str, os.PathLike)):
+        with open_file(file, 'rb', compression=compression or 'infer') as f:
+            table = pa_json.read_json(f)
+    else:
+        table = pa_json.read_json(file)
+    if columns is not None:
+        table = table.select([x for x in columns if x in table.column_names])
+    types_mapper = pd.ArrowDtype if dtype_backend == 'pyarrow' else None
+    df = table.to_pandas(types_mapper=types_mapper)
+    if columns is not None:
+        df = df.reindex(columns=columns)
+    if dtype is not None and not isinstance(dtype, bool):
+        df = df.astype(dtype)
+    return df
+
+def _read_feather(file, columns: Sequence[Hashable] = None, dtype=None, memory_map=True,
+                  dtype_backend=None, **kwargs) -> pd.DataFrame:
+    import pyarrow.feather as feather
+    if not isinstance(file, (str, os.PathLike)):
+        memory_map = False
+    else:
+        file = os.fspath(file)
+    # with memory map, uncompressed columns are not copied until they are used
+    table = feather.read_table(file, columns=columns, memory_map=memory_map, **kwargs)
+    if dtype_backend == 'pyarrow':
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = table.to_pandas(split_blocks=True)
+    if dtype is not None and not isinstance(dtype, bool):
+        df = df.astype(dtype)
+    return df
+
+# directory name for na values of a partition column, same as hive
+_HIVE_DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+def _partition_dirname(col: Hashable, value: Any) -> str:
+    if pd.isna(value):
+        value = _HIVE_DEFAULT_PARTITION
+    return f"{urllib.parse.quote(str(col), safe='')}={urllib.parse.quote(str(value), safe='')}"
+
+def _parse_partition_dirname(name: str) -> Union[Tuple[str, str], None]:
+    if '=' not in name or name.startswith(('.', '_')):
+        return None
+    col, value = name.split('=', 1)
+    return urllib.parse.unquote(col), urllib.parse.unquote(value)
+
+def _is_partitioned_dir(path: str) -> bool:
+    """
+    Whether the path is a directory written with `partition_cols`, i.e. it contains `col=value` sub dirs.
+    """
+    return os.path.isdir(path) and any(_parse_partition_dirname(x) and os.path.isdir(os.path.join(path, x))
+                                       for x in os.listdir(path))
+
+def _list_partitions(path: str) -> Tuple[List[str], pd.DataFrame]:
+    """
+    Find all data files in a partitioned directory.
+    :return:    the files, and values of partition columns for each file
+    """
+    files, values = [], []
+
+    def walk(dirname: str, partition: Dict[str, str]):
+        for name in sorted(os.listdir(dirname)):
+            child = os.path.join(dirname, name)
+            if os.path.isdir(child):
+                parsed = _parse_partition_dirname(name)
+                if parsed:
+                    walk(child, {**partition, parsed[0]: parsed[1]})
+            elif not name.startswith(('.', '_')):
+                files.append(child)
+                values.append(partition)
+
+    walk(path, {})
+    partitions = pd.DataFrame(values, index=range(len(files)), dtype=object)
+    for col in partitions.columns:
+        values = partitions[col].replace(_HIVE_DEFAULT_PARTITION, None)
+        try:
+            partitions[col] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            partitions[col] = values.infer_objects()
+    return files, partitions
+
+def _prune_partitions(partitions: pd.DataFrame, filters: FILTERS = None) -> pd.Series:
+    """
+    Decide which partitions may have rows matching the filters, by the filters on partition columns only.
+    """
+    filters = _normalize_filters(filters)
+    if not filters:
+        return pd.Series(True, index=partitions.index)
+    filters = [[x for x in conjunction if x[0] in partitions.columns] for conjunction in filters]
+    if any(not conjunction for conjunction in filters):
+        # a conjunction without partition columns may match any partition
+        return pd.Series(True, index=partitions.index)
+    return _filters_to_mask(partitions, filters)
+
+def _read_partitioned(path: str, read_func: Callable[..., Iterable[pd.DataFrame]], *args,
+                      columns: Sequence[Hashable] = None, filters: FILTERS = None,
+                      **kwargs) -> Iterable[pd.DataFrame]:
+    """
+    Read data files in a partitioned directory with `read_func`, partitions not matching the filters are skipped.
+    """
+    files, partitions = _list_partitions(path)
+    if not files:
+        raise FileNotFoundError(f"No data file in directory: {path}")
+    mask = _prune_partitions(partitions, filters)
+    read_columns = _read_columns(columns, filters)
+    if read_columns is not None:
+        # if only partition columns are needed, all columns are read, since no column means no row for some formats
+        read_columns = [x for x in read_columns if x not in partitions.columns] or None
+    for i in np.flatnonzero(mask.to_numpy()):
+        for df in read_func(files[i], *args, columns=read_columns, **kwargs):
+            for col in partitions.columns:
+                df[col] = partitions.at[i, col]
+            yield _select_rows_columns(df, columns=columns, filters=filters)
+
+def _read_excel(file, *args, sheet_name=0, sheet_workers: int = None,
+                **kwargs) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    if not sheet_workers or sheet_workers <= 1 or not isinstance(file, (str, os.PathLike)) \
+            or isinstance(sheet_name, (int, str)):
+        return pd.read_excel(file, *args, sheet_name=sheet_name, **kwargs)
+    if sheet_name is None:
+        with pd.ExcelFile(file, engine=kwargs.get('engine')) as f:
+            sheet_name = f.sheet_names
+    if len(sheet_name) <= 1:
+        return pd.read_excel(file, *args, sheet_name=sheet_name, **kwargs)
+    # every sheet is parsed in a worker process, which opens the file by itself
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(sheet_workers, len(sheet_name))) as executor:
+        futures = [executor.submit(pd.read_excel, os.fspath(file), *args, sheet_name=x, **kwargs)
+                   for x in sheet_name]
+        return {x: future.result() for x, future in zip(sheet_name, futures)}
+
+def _calamine_value(value: Any) -> Any:
+    # same conversion as `pd.read_excel(engine='calamine')`
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime.date):
+        return pd.Timestamp(value)
+    return value
+
+def _iter_excel_rows(file, sheet_name: Union[int, str] = 0, engine: str = None) -> Iterable[Sequence[Any]]:
+    if engine == 'calamine':
+        from python_calamine import CalamineWorkbook
+        if isinstance(file, (str, os.PathLike)):
+            book = CalamineWorkbook.from_path(os.fspath(file))
+        else:
+            book = CalamineWorkbook.from_filelike(file)
+        try:
+            if isinstance(sheet_name, int):
+                sheet = book.get_sheet_by_index(sheet_name)
+            else:
+                sheet = book.get_sheet_by_name(sheet_name)
+            for row in sheet.iter_rows():
+                yield [_calamine_value(x) for x in row]
+        finally:
+            book.close()
+    else:
+        from openpyxl import load_workbook
+        # cells are parsed from the xml lazily in read only mode
+        book = load_workbook(file, read_only=True, data_only=True)
+        try:
+            sheet = book.worksheets[sheet_name] if isinstance(sheet_name, int) else book[sheet_name]
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            book.close()
+
+def _dedup_names(names: List[Any]) -> List[Any]:
+    """
+    Rename duplicate names as `a`, `a.1`, `a.2`, same as `pd.read_excel()`.
+    """
+    names = list(names)
+    counts = collections.defaultdict(int)
+    for i, name in enumerate(names):
+        count = counts[name]
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def _iter_excel(file, chunksize: int, sheet_name: Union[int, str] = 0, dtype=None,
+                columns: Sequence[Hashable] = None, engine: str = None) -> Iterable[pd.DataFrame]:
+    rows = _iter_excel_rows(file, sheet_name=sheet_name, engine=engine)
+    header = list(next(rows, None) or [])
+    while header and header[-1] is None:
+        header.pop()
+    names = _dedup_names([f"Unnamed: {i}" if x is None else x for i, x in enumerate(header)])
+
+    def non_empty_rows():
+        # empty rows are kept only if followed by a non-empty row, same as `pd.read_excel()`
+        empty = 0
+        for row in rows:
+            row = list(row)
+            while row and row[-1] is None:
+                row.pop()
+            if not row:
+                empty += 1
+                continue
+            for _ in range(empty):
+                yield ()
+            empty = 0
+            yield tuple(row)
+
+    rows_iter = non_empty_rows()
+    offset = 0
+    while True:
+        chunk = list(itertools.islice(rows_iter, chunksize))
+        if not chunk:
+            break
+        # cells beyond the header are kept as unnamed columns, from the chunk where they appear
+        width = max(len(names), max(len(x) for x in chunk))
+        names += [f"Unnamed: {i}" for i in range(len(names), width)]
+        chunk = [x + (None,) * (width - len(x)) for x in chunk]
+        df = pd.DataFrame(chunk, columns=names, index=pd.RangeIndex(offset, offset + len(chunk)))
+        if columns is not None:
+            df = df[list(columns)]
+        if dtype is not None and not isinstance(dtype, bool):
+            df = df.astype(dtype)
+        offset += len(chunk)
+        yield df
+
+def read_dataframe(file: str, *args, sheet_name=0,
+                   file_format: FILE_FORMAT = None,
+                   jsonl=False, dtype: type = None,
+                   drop_na_columns=False, drop_na_rows=False,
+                   json_backend: Union[str, JsonBackend] = None,
+                   optimize_dtypes: Union[bool, Dict[str, Any]] = False,
+                   columns: Sequence[Hashable] = None, filters: FILTERS = None,
+                   sheet_workers: int = None,
+                   cache: Union[bool, Literal['content']] = False, cache_dir: str = None,
+                   **kwargs) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    read file as pandas `DataFrame`
+    :param file:        the file to be read, or a directory written with `partition_cols` by `save_dataframe()`,
+                        partition columns are added back, and partitions not matching `filters` are skipped
+    :param args:        extra args for `pd.read_xx()`
+    :param sheet_name:      `sheet_name` for `pd.read_excel()`
+    :param file_format:     csv, tsv, json ,xlsx, parquet, feather (or arrow);
+                            if not set, decided by the extension, or by the content if the extension is unknown
+    :param jsonl:       jsonl format or not, only used in json format when it can't be sniffed from the content
+    :param dtype:       `dtype` for `pd.read_xx()`
+    :param drop_na_columns:     drop column if all values of the column is na
+    :param drop_na_rows:        drop row if all values of the row is na
+    :param json_backend:    if set, parse jsonl with the json backend instead of `pd.read_json()`,
+                            only used without extra args, see `feilian.json.get_json_backend()`
+    :param optimize_dtypes:     convert columns to smaller dtypes with `optimize_dataframe()`,
+                                a dict means kwargs for it
+    :param columns:     only read these columns, other columns are skipped while parsing if the format supports
+    :param filters:     only keep rows matching the filters, e.g. `[('a', '>', 1), ('b', 'in', ['x', 'y'])]`,
+                        a list of tuples are joined with AND, a list of such lists are joined with OR;
+                        pushed down to the reader for parquet, applied after reading for other formats
+    :param sheet_workers:   if greater than 1, parse multi sheets of excel in worker processes,
+                            used when `sheet_name` is `None` or a list
+    :param cache:       cache the result on disk, it's reused if the file and args are not changed;
+                        the file is identified by its size and modified time, or its content hash if set as 'content';
+                        see `clear_dataframe_cache()` to remove the cache
+    :param cache_dir:   where to store the cache, see `set_dataframe_cache()`
+    :param kwargs:      extra kwargs for `pd.read_xx()`;
+                        set `engine='pyarrow'` to parse csv, tsv, jsonl and parquet with multi threads,
+                        and `dtype_backend='pyarrow'` to get arrow backed dtypes;
+                        set `engine='calamine'` to parse excel faster if python-calamine is installed;
+                        the default engine is used if the engine is not installed or the args are not supported
+    """
+    if cache and isinstance(file, (str, os.PathLike)) and os.path.isfile(file):
+        options = dict(sheet_name=sheet_name, file_format=file_format, jsonl=jsonl, dtype=dtype,
+                       drop_na_columns=drop_na_columns, drop_na_rows=drop_na_rows, optimize_dtypes=optimize_dtypes,
+                       columns=columns, filters=filters)
+        # records parsed by a json backend get different dtypes from `pd.read_json()`
+        backend = json_backend if json_backend is None or isinstance(json_backend, str) else json_backend.name
+        key = _cache_key(os.fspath(file), args, {**options, **kwargs, 'json_backend': backend},
+                         content=cache == 'content')
+        df = _load_cache(key, cache_dir=cache_dir)
+        if df is None:
+            df = read_dataframe(file, *args, json_backend=json_backend, sheet_workers=sheet_workers,
+                                **options, **kwargs)
+            _store_cache(key, df, cache_dir=cache_dir)
+        return df
+
+    if isinstance(file, (str, os.PathLike)) and os.path.isdir(file):
+        chunks = list(_read_partitioned(os.fspath(file), lambda *a, **k: [read_dataframe(*a, **k)], *args,
+                                        sheet_name=sheet_name, file_format=file_format, jsonl=jsonl, dtype=dtype,
+                                        json_backend=json_backend, columns=columns, filters=filters,
+                                        sheet_workers=sheet_workers, **kwargs))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+        return _post_process(df, drop_na_columns=drop_na_columns, drop_na_rows=drop_na_rows,
+                             optimize_dtypes=optimize_dtypes)
+
+    file_format, jsonl = _normalize_read_format(file, file_format, jsonl, kwargs)
+    read_columns = _read_columns(columns, filters)
+    # `usecols` of pandas is still accepted
+    usecols = kwargs.pop('usecols', None) if read_columns is None else read_columns
+    engine = _check_engine(kwargs)
+    arrow_json = False
+    if engine == 'pyarrow' and file_format not in ('csv', 'parquet'):
+        # only jsonl can be parsed by `pyarrow.json`, which is always utf-8
+        kwargs.pop('engine')
+        arrow_json = file_format == 'json' and jsonl and not args \
+            and set(kwargs) <= {'compression', 'dtype_backend', 'encoding'} \
+            and kwargs.get('encoding', 'utf-8').lower().replace('-', '') == 'utf8'
+        if not arrow_json and file_format != 'feather':
+            warnings.warn("pyarrow engine is not supported for the file or args, fall back to the default engine.")
 
     if file_format == 'csv':
-        df = pd.read_csv(file, *args, dtype=dtype, **kwargs)
+        df = _read_csv(file, *args, dtype=dtype, usecols=usecols, **kwargs)
     elif file_format == 'xlsx':
-        df = pd.read_excel(file, *args, sheet_name=sheet_name, dtype=dtype, **kwargs)
+        df = _read_excel(file, *args, sheet_name=sheet_name, dtype=dtype, usecols=usecols,
+                         sheet_workers=sheet_workers, **kwargs)
+    elif file_format == 'json' and jsonl and json_backend and not args and not kwargs:
+        df = _json_records_to_dataframe(iter_json(file, jsonl=True, backend=json_backend), dtype=dtype,
+                                        columns=read_columns)
+    elif file_format == 'json' and arrow_json:
+        df = _read_jsonl_pyarrow(file, dtype=dtype, columns=read_columns,
+                                 compression=kwargs.get('compression'), dtype_backend=kwargs.get('dtype_backend'))
+    elif file_format == 'json' and jsonl and read_columns is not None:
+        # read as chunks, so that only the needed columns of the whole file are kept in memory
+        with pd.read_json(file, *args, lines=True, dtype=dtype, chunksize=10000, **kwargs) as reader:
+            chunks = [x.reindex(columns=read_columns) for x in reader]
+        df = pd.concat(chunks) if chunks else pd.DataFrame(columns=read_columns)
     elif file_format == 'json':
-        try:
-            df = pd.read_json(file, *args, lines=jsonl, dtype=dtype, **kwargs)
-        except Exception as e:
-            # if failed, try again with different arg `lines`
-            try:
-                df = pd.read_json(file, *args, lines=not jsonl, dtype=dtype, **kwargs)
-            except Exception:
-                raise e
+        df = pd.read_json(file, *args, lines=jsonl, dtype=dtype, **kwargs)
     elif file_format == 'parquet':
-        df = pd.read_parquet(file, *args, **kwargs)
+        df = pd.read_parquet(file, *args, columns=columns, filters=_normalize_filters(filters) or None, **kwargs)
+        filters = None
+    elif file_format == 'feather':
+        df = _read_feather(file, columns=read_columns, dtype=dtype, **kwargs)
     else:
         raise IOError(f"Unknown file format: {file}")
 
-    if drop_na_columns:
-        _drop_na_values(df, axis='columns')
-    if drop_na_rows:
-        _drop_na_values(df, axis='rows')
+    df = _select_rows_columns(df, columns=columns, filters=filters)
+    return _post_process(df, drop_na_columns=drop_na_columns, drop_na_rows=drop_na_rows,
+                         optimize_dtypes=optimize_dtypes)
+
+def _iter_record_batches(batches: Iterable[Any]) -> Iterable[pd.DataFrame]:
+    offset = 0
+    for batch in batches:
+        df = batch.to_pandas()
+        # every batch restarts a default index, shift it to be continuous as the whole file
+        if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1:
+            df.index = pd.RangeIndex(offset, offset + len(df))
+        offset += len(df)
+        yield df
+
+def _iter_parquet(file, batch_size: int, **kwargs) -> Iterable[pd.DataFrame]:
+    import pyarrow.parquet as pq
+    return _iter_record_batches(pq.ParquetFile(file).iter_batches(batch_size=batch_size, **kwargs))
+
+def _iter_feather(file, batch_size: int, columns: Sequence[Hashable] = None, **kwargs) -> Iterable[pd.DataFrame]:
+    import pyarrow.feather as feather
+    memory_map = isinstance(file, (str, os.PathLike))
+    if memory_map:
+        file = os.fspath(file)
+    # only the pages of the current batch are loaded with memory map
+    table = feather.read_table(file, columns=columns, memory_map=memory_map, **kwargs)
+    return _iter_record_batches(table.to_batches(max_chunksize=batch_size))
+
+def iter_read_dataframe(file: str, *args, chunksize: int = 10000,
+                        sheet_name=0, file_format: FILE_FORMAT = None,
+                        jsonl=False, dtype: type = None,
+                        drop_na_columns=False, drop_na_rows=False,
+                        json_backend: Union[str, JsonBackend] = None,
+                        columns: Sequence[Hashable] = None, filters: FILTERS = None,
+                        **kwargs) -> Iterable[pd.DataFrame]:
+    """
+    read file as chunks of pandas `DataFrame`, so that the whole file never need to be in memory
+    csv, tsv, jsonl, parquet, feather and xlsx (a single sheet without extra args) are read lazily,
+    other formats are read at once and then split to chunks
+    :param file:        the file to be read, or a partitioned directory, see `read_dataframe()`
+    :param args:        extra args for `pd.read_xx()`
+    :param chunksize:   max rows of each chunk
+    :param sheet_name:      `sheet_name` for `pd.read_excel()`, should be a single sheet
+    :param file_format:     csv, tsv, json ,xlsx, parquet, feather (or arrow)
+    :param jsonl:       jsonl format or not, only used in json format
+    :param dtype:       `dtype` for `pd.read_xx()`
+    :param drop_na_columns:     drop column if all values of the column is na, applied on every chunk
+    :param drop_na_rows:        drop row if all values of the row is na, applied on every chunk
+    :param json_backend:    if set, parse jsonl with the json backend instead of `pd.read_json()`,
+                            only used without extra args, see `feilian.json.get_json_backend()`
+    :param columns:     only read these columns
+    :param filters:     only keep rows matching the filters, applied on every chunk, see `read_dataframe()`
+    :param kwargs:      extra kwargs for `pd.read_xx()`
+    """
+    if chunksize <= 0:
+        raise ValueError("Param 'chunksize' should be a positive integer.")
+    if kwargs.pop('optimize_dtypes', False):
+        # dtypes optimized for every chunk may be different from each other
+        raise ValueError("Param 'optimize_dtypes' is not supported when reading as chunks.")
+
+    if isinstance(file, (str, os.PathLike)) and os.path.isdir(file):
+        yield from _read_partitioned(os.fspath(file), iter_read_dataframe, *args, chunksize=chunksize,
+                                     sheet_name=sheet_name, file_format=file_format, jsonl=jsonl, dtype=dtype,
+                                     drop_na_columns=drop_na_columns, drop_na_rows=drop_na_rows,
+                                     json_backend=json_backend, columns=columns, filters=filters, **kwargs)
+        return
 
+    file_format, jsonl = _normalize_read_format(file, file_format, jsonl, kwargs)
+    read_columns = _read_columns(columns, filters)
+    # `usecols` of pandas is still accepted
+    usecols = kwargs.pop('usecols', None) if read_columns is None else read_columns
+    lazy = file_format in ('csv', 'parquet', 'feather') or file_format == 'json' and jsonl
+    if _check_engine(kwargs) == 'pyarrow' and lazy:
+        # parquet is always read lazily by pyarrow, while csv and jsonl can't be
+        kwargs.pop('engine')
+        if file_format in ('csv', 'json'):
+            warnings.warn("pyarrow engine is not supported when reading as chunks, fall back to the default engine.")
+
+    if file_format == 'csv':
+        reader = pd.read_csv(file, *args, dtype=dtype, usecols=usecols, chunksize=chunksize, **kwargs)
+    elif file_format == 'json' and jsonl and json_backend and not args and not kwargs:
+        reader = _iter_json_chunks(file, chunksize=chunksize, backend=json_backend, dtype=dtype, columns=read_columns)
+    elif file_format == 'json' and jsonl:
+        reader = pd.read_json(file, *args, lines=True, dtype=dtype, chunksize=chunksize, **kwargs)
+        if read_columns is not None:
+            reader = (df.reindex(columns=read_columns) for df in reader)
+    elif file_format == 'parquet':
+        reader = _iter_parquet(file, batch_size=chunksize, columns=read_columns, **kwargs)
+    elif file_format == 'feather':
+        reader = _iter_feather(file, batch_size=chunksize, columns=read_columns, **kwargs)
+    elif file_format == 'xlsx' and not args and set(kwargs) <= {'engine'} and isinstance(sheet_name, (int, str)):
+        reader = _iter_excel(file, chunksize=chunksize, sheet_name=sheet_name, dtype=dtype,
+                             columns=read_columns, engine=kwargs.get('engine'))
+    else:
+        # no lazy reader for the format, read the whole file and then split it
+        df = read_dataframe(file, *args, sheet_name=sheet_name, file_format=file_format, jsonl=jsonl, dtype=dtype,
+                            drop_na_columns=drop_na_columns, drop_na_rows=drop_na_rows,
+                            columns=columns, filters=filters, **kwargs)
+        if not isinstance(df, pd.DataFrame):
+            raise ValueError("Only a single sheet can be read as chunks.")
+        for i in range(0, len(df), chunksize):
+            yield df.iloc[i:i+chunksize]
+        return
+
+    with contextlib.closing(reader) if hasattr(reader, 'close') else contextlib.nullcontext():
+        for df in reader:
+            df = _select_rows_columns(df, columns=columns, filters=filters)
+            yield _post_process(df, drop_na_columns=drop_na_columns, drop_na_rows=drop_na_rows)
+
+def _is_path(file) -> bool:
+    # `pd.ExcelWriter` is also path-like
+    return isinstance(file, (str, os.PathLike)) and not isinstance(file, pd.ExcelWriter)
+
+def _decide_save_format(file, file_format: FILE_FORMAT = None) -> str:
+    if not file_format:
+        if isinstance(file, (str, os.PathLike)):
+            file_format = os.path.splitext(file)[1].lower()[1:]
+        elif isinstance(file, pd.ExcelWriter):
+            file_format = 'xlsx'
+        else:
+            raise ValueError("Format should given!")
+    return file_format
+
+def _select_columns(df: pd.DataFrame,
+                    column_mapper: Union[Dict[str, str], Sequence[str]] = None,
+                    include_columns: Sequence[str] = None,
+                    exclude_columns: Sequence[str] = None) -> pd.DataFrame:
+    if column_mapper:
+        df = df.rename(columns=column_mapper)
+    if exclude_columns:
+        df = df.drop(exclude_columns, axis=1)
+    if include_columns:
+        df = df.reindex(include_columns, axis=1)
     return df
 
+def _json_index_arg():
+    # for orient except 'split' and 'table', old pandas requires `index` to be `True`,
+    # while new pandas requires it to be `None`
+    return True if pd_version[0] < 2 else None
+
+def _pandas_csv_column(s: pd.Series, special: str):
+    """
+    Convert a column to an arrow array which is written the same as pandas.
+    :return:    `None` if not supported
+    """
+    import pyarrow as pa
+    dtype = s.dtype
+    if pd.api.types.is_bool_dtype(dtype) or (dtype == object and pd.api.types.infer_dtype(s, skipna=True) == 'boolean'):
+        # pandas writes `True` and `False`, but arrow writes `true` and `false`
+        na = s.isna().to_numpy()
+        values = np.where(s.to_numpy(dtype=bool, na_value=False), 'True', 'False')
+        return pa.array(values, type=pa.string(), mask=na)
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.array(s, from_pandas=True)
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        # arrow writes `1.0` as `1`, and `1e-05` as `0.00001`, format them as pandas does
+        na = s.isna().to_numpy()
+        return pa.array(s.to_numpy().astype(str), type=pa.string(), mask=na)
+    if pd.api.types.is_string_dtype(dtype) and pd.api.types.infer_dtype(s, skipna=True) in ('string', 'empty'):
+        if s.str.contains(special, regex=True).any():
+            # need to be quoted
+            return None
+        return pa.array(s.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    return None
+
+def _save_csv_pyarrow(file, df: pd.DataFrame, *args, index=False, encoding='utf-8', newline='\n',
+                      compression: COMPRESSION_FORMAT = None, sep=',', **kwargs) -> bool:
+    """
+    Save csv with `pyarrow.csv`, only simple cases are supported.
+    The output is the same as pandas, cases written differently by arrow are not supported:
+        - columns other than int, float, bool and string, such as datetime and category
+        - column names which are not strings
+        - strings need to be quoted, containing `sep`, quote char or line breaks
+        - a single column with empty values, which pandas writes as `""`
+    :return:    saved or not, should fall back to pandas if not saved
+    """
+    if args or kwargs or index or not isinstance(file, (str, os.PathLike)) or len(sep) != 1:
+        return False
+    if encoding.lower().replace('-', '') != 'utf8':
+        return False
+    if compression == 'infer':
+        compression = infer_compression(os.fspath(file))
+    if compression not in (None, 'gzip', 'bz2'):
+        return False
+    if df.shape[1] == 0 or not df.columns.is_unique or not all(isinstance(x, str) for x in df.columns):
+        return False
+    special = '[' + re.escape(sep + '"\r\n') + ']'
+    if any(re.search(special, x) for x in df.columns):
+        return False
+    if df.shape[1] == 1 and (df.columns[0] == '' or df.iloc[:, 0].isna().any() or (df.iloc[:, 0] == '').any()):
+        # an empty line can't be read back, pandas quotes it
+        return False
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    arrays = []
+    for _, s in df.items():
+        arr = _pandas_csv_column(s, special)
+        if arr is None:
+            return False
+        arrays.append(arr)
+    table = pa.Table.from_arrays(arrays, names=list(df.columns))
+    # arrow always quotes the header, so write it manually
+    options = pa_csv.WriteOptions(include_header=False, delimiter=sep, quoting_style='none', eol=newline) \
+        if newline != '\n' else pa_csv.WriteOptions(include_header=False, delimiter=sep, quoting_style='none')
+    with pa.output_stream(os.fspath(file), compression=compression) as f:
+        f.write((sep.join(df.columns) + newline).encode('utf-8'))
+        pa_csv.write_csv(table, f, write_options=options)
+    return True
+
+def _save_feather(file, df: pd.DataFrame, *args, compression: COMPRESSION_FORMAT = None, index=False, **kwargs):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    table = pa.Table.from_pandas(df, preserve_index=index)
+    if isinstance(file, os.PathLike):
+        file = os.fspath(file)
+    # uncompressed file can be read by memory map without copy
+    feather.write_feather(table, file, *args, compression=compression or 'uncompressed', **kwargs)
+
+def _next_part_file(dirname: str, ext: str) -> str:
+    i = 0
+    if os.path.isdir(dirname):
+        names = set(os.listdir(dirname))
+        while f'part-{i}.{ext}' in names:
+            i += 1
+    return os.path.join(dirname, f'part-{i}.{ext}')
+
+def _save_partitioned(path: str, df: pd.DataFrame, *args, partition_cols: Sequence[str], file_format: str, **kwargs):
+    partition_cols = list(partition_cols)
+    data_cols = [x for x in df.columns if x not in partition_cols]
+    if not data_cols:
+        raise ValueError("Can't use all columns as partition columns.")
+    for values, group in df.groupby(partition_cols, dropna=False, sort=False):
+        if not isinstance(values, tuple):
+            values = (values,)
+        dirname = os.path.join(path, *[_partition_dirname(c, v) for c, v in zip(partition_cols, values)])
+        save_dataframe(_next_part_file(dirname, file_format), group[data_cols], *args,
+                       file_format=file_format, **kwargs)
+
 def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[str]'],
                    df: Union[pd.DataFrame, Iterable[Union[pd.Series, Dict[str, Any]]]],
                    *args, sheet_name='Sheet1',
@@ -108,6 +891,8 @@ def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[st
                    column_mapper: Union[Dict[str, str], Sequence[str]] = None,
                    include_columns: Sequence[str] = None,
                    exclude_columns: Sequence[str] = None,
+                   partition_cols: Sequence[str] = None,
+                   atomic=True,
                    **kwargs):
     """
     save data into file
@@ -115,9 +900,10 @@ def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[st
     :param df:                  the data
     :param args:                extra args for df.to_xx()
     :param sheet_name:          `sheet_name` for excel format
-    :param file_format:         csv, tsv, json, xlsx, parquet
+    :param file_format:         csv, tsv, json, xlsx, parquet, feather (or arrow)
     :param compression:         name of the compression to use.
                                 use `None` for no compression.
+                                for feather format, lz4 or zstd, and no compression is best for memory map
     :param index:               save index or not, see docs in df.to_csv();
                                 if set as str and `index_label` not set, `index_label` will be set as this
     :param index_label:         header for the index when `index` is `True`
@@ -130,16 +916,20 @@ def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[st
     :param column_mapper:       rename columns; if set, columns not list here will be ignored
     :param include_columns:     if set, columns not list here will be ignored
     :param exclude_columns:     if set, columns list here will be ignored
-    :param kwargs:              extra kwargs for df.to_xx()
+    :param partition_cols:      if set, `file` is a directory, data is split by values of these columns,
+                                and saved as `col1=value1/col2=value2/part-N.ext` without these columns;
+                                a new part is added if the partition exists;
+                                the format is parquet if `file_format` not set and `file` has no extension
+    :param atomic:              write to a temporary file, and rename it to `file` after finished,
+                                so that a failed or killed job never leaves a truncated file;
+                                ignored when appending with `mode='a'`
+    :param kwargs:              extra kwargs for df.to_xx();
+                                set `engine='pyarrow'` to write csv or tsv with multi threads,
+                                the default engine is used if pyarrow is not installed or the args are not supported
     """
     # decide file format
-    if not file_format:
-        if isinstance(file, str):
-            file_format = os.path.splitext(file)[1].lower()[1:]
-        elif isinstance(file, pd.ExcelWriter):
-            file_format = 'xlsx'
-        else:
-            raise ValueError("Format should given!")
+    file_format = _decide_save_format(file, file_format)
+    engine = _check_engine(kwargs)
 
     # convert data to be a dataframe
     if not isinstance(df, pd.DataFrame):
@@ -150,12 +940,28 @@ def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[st
             jsonl = True
 
     # deal with columns
-    if column_mapper:
-        df = df.rename(columns=column_mapper)
-    if exclude_columns:
-        df = df.drop(exclude_columns, axis=1)
-    if include_columns:
-        df = df.reindex(include_columns, axis=1)
+    df = _select_columns(df, column_mapper=column_mapper,
+                         include_columns=include_columns, exclude_columns=exclude_columns)
+
+    if partition_cols:
+        if not isinstance(file, (str, os.PathLike)):
+            raise ValueError("Partitioned data should be saved to a directory.")
+        _save_partitioned(os.fspath(file), df, *args, partition_cols=partition_cols,
+                          file_format=file_format or 'parquet', sheet_name=sheet_name, compression=compression,
+                          index=index, index_label=index_label, encoding=encoding, newline=newline,
+                          force_ascii=force_ascii, orient=orient, jsonl=jsonl, indent=indent,
+                          atomic=atomic, **kwargs)
+        return
+
+    # appending to an existing file can't be done in a temporary file
+    if atomic and _is_path(file) and 'a' not in kwargs.get('mode', 'w'):
+        with atomic_path(os.fspath(file)) as tmp:
+            # columns have been selected
+            save_dataframe(tmp, df, *args, sheet_name=sheet_name, file_format=file_format,
+                           compression=compression, index=index, index_label=index_label,
+                           encoding=encoding, newline=newline, force_ascii=force_ascii,
+                           orient=orient, jsonl=jsonl, indent=indent, atomic=False, **kwargs)
+        return
 
     # ensure parent dir exists
     if isinstance(file, (str, os.PathLike)):
@@ -173,6 +979,16 @@ def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[st
     elif file_format == 'jsonl':
         file_format = 'json'
         jsonl = True
+    elif file_format == 'arrow':
+        file_format = 'feather'
+
+    if engine == 'pyarrow' and file_format != 'parquet':
+        kwargs.pop('engine')
+        if file_format == 'csv' and _save_csv_pyarrow(file, df, *args, index=index, encoding=encoding,
+                                                      newline=newline, compression=compression, **kwargs):
+            return
+        if file_format != 'feather':
+            warnings.warn("pyarrow engine is not supported for the file or args, fall back to the default engine.")
 
     # save to file for different format
     if file_format == 'csv':
@@ -185,15 +1001,259 @@ def save_dataframe(file: Union[str, 'pd.WriteBuffer[bytes]',  'pd.WriteBuffer[st
         if jsonl:
             orient = 'records'
         if orient not in ['split', 'table']:
-            index = True
+            index = _json_index_arg()
         df.to_json(file, *args, compression=compression, index=index,
                    force_ascii=force_ascii, orient=orient, lines=jsonl,
                    indent=indent, **kwargs)
     elif file_format == 'parquet':
         df.to_parquet(file, *args, compression=compression, index=index, **kwargs)
+    elif file_format == 'feather':
+        _save_feather(file, df, *args, compression=compression, index=index, **kwargs)
     else:
         raise IOError(f"Unknown file format: {file}")
 
+class DataframeWriter(object):
+    """
+    Write dataframes into a file chunk by chunk, all chunks are appended to the same file.
+    Output is same as calling `save_dataframe()` once with all chunks concatenated.
+    Supported formats: csv, tsv, json (only jsonl), xlsx, parquet, feather (or arrow).
+    """
+
+    def __init__(self, file: Union[str, os.PathLike, 'pd.WriteBuffer[bytes]', 'pd.WriteBuffer[str]'],
+                 *args, sheet_name='Sheet1',
+                 file_format: FILE_FORMAT = None,
+                 compression: COMPRESSION_FORMAT = None,
+                 index=False, index_label=None,
+                 encoding='utf-8', newline='\n',
+                 force_ascii=False, jsonl=True,
+                 column_mapper: Union[Dict[str, str], Sequence[str]] = None,
+                 include_columns: Sequence[str] = None,
+                 exclude_columns: Sequence[str] = None,
+                 atomic=True,
+                 **kwargs):
+        """
+        Args are same as `save_dataframe()`.
+        With `atomic`, chunks are written to a temporary file, which is renamed to `file` when closed,
+        or removed by `discard()` or an error in the `with` block.
+        """
+        self.file = file
+        self.atomic = atomic
+        self.file_format = _decide_save_format(file, file_format)
+        self.args = args
+        self.sheet_name = sheet_name
+        self.compression = compression
+        self.encoding = encoding
+        self.newline = newline
+        self.force_ascii = force_ascii
+        self.column_mapper = column_mapper
+        self.include_columns = include_columns
+        self.exclude_columns = exclude_columns
+        self.header = kwargs.pop('header', True)
+        self.kwargs = kwargs
+
+        for key in ['lines', 'line_delimited_json_format']:
+            if key in kwargs and kwargs.pop(key):
+                jsonl = True
+
+        # compatible for set index just use arg `index`
+        if index_label is None and isinstance(index, str):
+            index, index_label = True, index
+        self.index = index
+        self.index_label = index_label
+
+        # handle special formats
+        if self.file_format == 'tsv':
+            # tsv is actually a csv
+            self.file_format = 'csv'
+            self.kwargs['sep'] = '\t'
+        elif self.file_format == 'jsonl':
+            self.file_format = 'json'
+            jsonl = True
+        elif self.file_format == 'arrow':
+            self.file_format = 'feather'
+        if self.file_format == 'json' and not jsonl:
+            raise ValueError("Only jsonl format can be written as chunks.")
+        if self.file_format not in ['csv', 'json', 'xlsx', 'parquet', 'feather']:
+            raise IOError(f"Unknown file format: {file}")
+
+        self.columns = None     # columns of the first chunk, all chunks will be aligned to it
+        self._float_columns = set()     # columns written as float, integers of later chunks are converted
+        self.rows = 0           # rows have been written
+        self.started = False    # any chunk has been written or not
+        self.closed = False
+        self._handle = None     # the opened file handle or writer
+        self._schema = None     # arrow schema for feather format
+        self._owned = False     # should close the handle or not
+        self._atomic = None     # context of the temporary file in atomic mode
+
+    def _align_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.columns is None:
+            self.columns = df.columns
+            return df
+        if df.columns.equals(self.columns):
+            return df
+        unknown = df.columns.difference(self.columns)
+        if len(unknown) > 0:
+            raise ValueError(f"Columns not exist in the first chunk: {list(unknown)}")
+        return df.reindex(self.columns, axis=1)
+
+    def _align_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert integers to float if the column has been written as float, or only with na values,
+        which is float if all chunks are concatenated.
+        Integers written before a chunk with na values can't be changed.
+        """
+        if not df.columns.is_unique:
+            return df
+        ints = {k: 'float64' for k, s in df.items() if k in self._float_columns
+                and isinstance(s.dtype, np.dtype) and s.dtype.kind in 'iu'}
+        if ints:
+            df = df.astype(ints)
+        for k, s in df.items():
+            if pd.api.types.is_float_dtype(s.dtype) or (s.dtype == object and len(s) > 0 and s.isna().all()):
+                self._float_columns.add(k)
+        return df
+
+    def _open(self, df: pd.DataFrame):
+        file = self.file
+        if _is_path(file):
+            ensure_parent_dir_exist(file)
+            self._owned = True
+            if self.atomic:
+                self._atomic = atomic_path(os.fspath(file))
+                file = self._atomic.__enter__()
+        if self.file_format == 'csv':
+            if self._owned:
+                file = open_file(os.fspath(file), 'w', encoding=self.encoding, newline='',
+                                 compression=self.compression)
+            self._handle = file
+        elif self.file_format == 'json':
+            if self._owned:
+                file = open_file(os.fspath(file), 'w', encoding='utf-8', newline='',
+                                 compression=self.compression)
+            self._handle = file
+        elif self.file_format == 'xlsx':
+            if isinstance(file, pd.ExcelWriter):
+                self._handle = file
+            else:
+                self._handle = pd.ExcelWriter(file)
+                self._owned = True
+        elif self.file_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.Schema.from_pandas(df, preserve_index=self.index)
+            self._handle = pq.ParquetWriter(file, schema, *self.args, compression=self.compression, **self.kwargs)
+            self._owned = True
+        elif self.file_format == 'feather':
+            import pyarrow as pa
+            self._schema = pa.Schema.from_pandas(df, preserve_index=self.index)
+            options = pa.ipc.IpcWriteOptions(compression=self.compression, **self.kwargs)
+            sink = os.fspath(file) if isinstance(file, os.PathLike) else file
+            self._handle = pa.ipc.new_file(sink, self._schema, options=options)
+            self._owned = True
+
+    def write(self, df: Union[pd.DataFrame, Iterable[Union[pd.Series, Dict[str, Any]]]]):
+        """
+        Append a chunk of data to the file.
+        """
+        if self.closed:
+            raise ValueError("Write to a closed writer.")
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(df)
+        df = _select_columns(df, column_mapper=self.column_mapper,
+                             include_columns=self.include_columns, exclude_columns=self.exclude_columns)
+        if self.columns is None and len(df) == 0 and len(df.columns) == 0:
+            # nothing to decide the columns
+            return
+        df = self._align_dtypes(self._align_columns(df))
+        if self._handle is None:
+            self._open(df)
+        elif len(df) == 0:
+            return
+
+        first = not self.started
+        header = self.header if first else False
+        if self.file_format == 'csv':
+            kwargs = {PD_PARAM_NEWLINE: self.newline, **self.kwargs}
+            df.to_csv(self._handle, *self.args, header=header,
+                      index=self.index, index_label=self.index_label, **kwargs)
+        elif self.file_format == 'json':
+            if len(df) > 0:
+                self._handle.write(df.to_json(None, *self.args, index=_json_index_arg(),
+                                              force_ascii=self.force_ascii, orient='records',
+                                              lines=True, **self.kwargs))
+        elif self.file_format == 'xlsx':
+            # rows after the first chunk are placed below the header
+            df.to_excel(self._handle, *self.args, index=self.index, index_label=self.index_label,
+                        sheet_name=self.sheet_name, header=header,
+                        startrow=self.rows + (1 if self.started and self.header is not False else 0),
+                        **self.kwargs)
+        elif self.file_format == 'parquet':
+            import pyarrow as pa
+            table = pa.Table.from_pandas(df, schema=self._handle.schema, preserve_index=self.index)
+            self._handle.write_table(table)
+        elif self.file_format == 'feather':
+            import pyarrow as pa
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=self.index)
+            self._handle.write_table(table)
+        self.started = True
+        self.rows += len(df)
+
+    def close(self):
+        """
+        Flush and close the file, if the file is opened by this writer.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._handle is None:
+            return
+        try:
+            if self._owned:
+                self._handle.close()
+            elif hasattr(self._handle, 'flush'):
+                self._handle.flush()
+        except BaseException:
+            self._finish_atomic(discard=True)
+            raise
+        self._handle = None
+        self._finish_atomic()
+
+    def _finish_atomic(self, discard=False):
+        if self._atomic is None:
+            return
+        atomic, self._atomic = self._atomic, None
+        if discard:
+            # the temporary file is removed without replacing the target
+            atomic.__exit__(RuntimeError, RuntimeError("discarded"), None)
+        else:
+            atomic.__exit__(None, None, None)
+
+    def discard(self):
+        """
+        Close the writer, in atomic mode, remove the temporary file and keep the target unchanged.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self._handle is None:
+            return
+        try:
+            if self._owned:
+                self._handle.close()
+        finally:
+            self._handle = None
+            self._finish_atomic(discard=True)
+
+    def __enter__(self) -> 'DataframeWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
 def iter_dataframe(data: pd.DataFrame,
                    progress_bar: Union[bool, str, 'tqdm', Callable[[Iterable[Any]], 'tqdm']] = False
                    ) -> Iterable[Tuple[Hashable, pd.Series]]:
@@ -217,44 +1277,139 @@ def iter_dataframe(data: pd.DataFrame,
             rows = tqdm(rows, total=len(data))
     return rows
 
+def _sample_rows(rows: Iterable[pd.Series], size: int, shuffle: bool, rng: random.Random) -> List[pd.Series]:
+    if size <= 0:
+        result = list(rows)
+        if shuffle:
+            rng.shuffle(result)
+        return result
+    if not shuffle:
+        return list(itertools.islice(rows, size))
+    # reservoir sampling, only `size` rows are kept in memory
+    result = []
+    for n, row in enumerate(rows):
+        if n < size:
+            result.append(row)
+        else:
+            k = rng.randrange(n + 1)
+            if k < size:
+                result[k] = row
+    rng.shuffle(result)
+    return result
+
 def extract_dataframe_sample(data: pd.DataFrame,
-                             filter_func: Callable[[pd.Series], bool],
+                             filter_func: Union[Callable[[pd.Series], bool],
+                                                Callable[[pd.DataFrame], Union[pd.Series, np.ndarray]],
+                                                pd.Series, np.ndarray, Sequence[bool]],
                              size=0, shuffle=False,
                              return_format: Literal['df', 'dataframe', 'list'] = 'dataframe',
-                             progress_bar=False) -> Union[pd.DataFrame, List[pd.Series]]:
+                             progress_bar=False, vectorized=False,
+                             random_state: int = None) -> Union[pd.DataFrame, List[pd.Series]]:
     """
     extract sample from a dataframe
     :param data:            original data
-    :param filter_func:     bool function, `True` means to reserve the row
+    :param filter_func:     bool function, `True` means to reserve the row;
+                            can also be a bool mask in the same order as rows of the data
     :param size:            max size for the result
     :param shuffle:         shuffle result or not
-    :param progress_bar:    passed to `iter_dataframe()`
+    :param progress_bar:    passed to `iter_dataframe()`, not used with a mask
     :param return_format:   one of {'dataframe', 'list'}
+    :param vectorized:      if `True`, `filter_func` is called with the whole data and should return a bool mask
+    :param random_state:    seed to shuffle the result, for reproducibility
     """
-    result = [row for _, row in iter_dataframe(data, progress_bar=progress_bar) if filter_func(row)]
-    if shuffle:
-        random.shuffle(result)
-    if 0 < size < len(result):
-        result = result[:size]
-    if return_format == 'df' or return_format == 'dataframe':
-        try:
-            return pd.DataFrame(result)
-        except pd.errors.InvalidIndexError:
-            return pd.DataFrame([{k: v for k, v in x.items()} for x in result])
-    elif return_format == 'list':
+    if return_format not in ['df', 'dataframe', 'list']:
+        raise ValueError("Param 'return_format' should be one of {'dataframe', 'list'}.")
+
+    if vectorized or not callable(filter_func):
+        # select rows by a mask, only positions of matched rows are kept
+        mask = filter_func(data) if callable(filter_func) else filter_func
+        positions = np.flatnonzero(np.asarray(mask, dtype=bool))
+        if shuffle:
+            n = size if 0 < size < len(positions) else len(positions)
+            positions = np.random.default_rng(random_state).choice(positions, n, replace=False)
+        elif 0 < size < len(positions):
+            positions = positions[:size]
+        df = data.iloc[positions]
+        if return_format == 'list':
+            return [row for _, row in df.iterrows()]
+        return df
+
+    rng = random if random_state is None else random.Random(random_state)
+    rows = (row for _, row in iter_dataframe(data, progress_bar=progress_bar) if filter_func(row))
+    result = _sample_rows(rows, size=size, shuffle=shuffle, rng=rng)
+    if return_format == 'list':
         return result
-    raise ValueError("Param 'return_format' should be one of {'dataframe', 'list'}.")
+    try:
+        return pd.DataFrame(result)
+    except pd.errors.InvalidIndexError:
+        return pd.DataFrame([{k: v for k, v in x.items()} for x in result])
 
-def is_empty_text(s: str) -> bool:
+_TEXT_ARRAY_TYPES = (pd.Series, np.ndarray)
+
+def _text_mask(s: Union[pd.Series, np.ndarray], scalar_test: Callable[[Any], Any],
+               string_test: Callable[[pd.Series, pd.Series], pd.Series],
+               number_test: Callable[[pd.Series, pd.Series], pd.Series]) -> Union[pd.Series, np.ndarray]:
+    """
+    Test all values at once, the result is same as testing every value with `scalar_test`.
+    :param s:               values to be tested
+    :param scalar_test:     test a single value, used when values are in mixed types
+    :param string_test:     test all values with the na mask, when values are all strings
+    :param number_test:     test all values with the na mask, when values are all numbers
+    """
+    values = s if isinstance(s, pd.Series) else pd.Series(s)
+    na = values.isna()
+    dtype = values.dtype
+    if pd.api.types.is_string_dtype(dtype) and (
+            dtype != object or pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty')):
+        mask = string_test(values, na)
+    elif pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        mask = number_test(values, na)
+    else:
+        mask = values.map(lambda x: bool(scalar_test(x)))
+    mask = mask.fillna(False).astype(bool)
+    return mask if isinstance(s, pd.Series) else mask.to_numpy()
+
+def _is_zero(values: pd.Series) -> pd.Series:
+    return (values == 0).fillna(False).astype(bool)
+
+def is_empty_text(s: Union[str, pd.Series, np.ndarray]) -> Union[bool, pd.Series, np.ndarray]:
+    """
+    test if s is na or empty string, a series or an array is tested element-wise and returns a bool mask
+    """
+    if isinstance(s, _TEXT_ARRAY_TYPES):
+        return _text_mask(s, is_empty_text,
+                          string_test=lambda x, na: na | (x.str.len() == 0),
+                          number_test=lambda x, na: na | _is_zero(x))
     return pd.isna(s) or not s
 
-def is_nonempty_text(s: str) -> bool:
+def is_nonempty_text(s: Union[str, pd.Series, np.ndarray]) -> Union[bool, pd.Series, np.ndarray]:
+    """
+    test if s is not na and non-empty string, a series or an array is tested element-wise and returns a bool mask
+    """
+    if isinstance(s, _TEXT_ARRAY_TYPES):
+        return _text_mask(s, is_nonempty_text,
+                          string_test=lambda x, na: ~na & (x.str.len() > 0),
+                          number_test=lambda x, na: pd.Series(False, index=x.index))
     return pd.notna(s) and isinstance(s, str) and s
 
-def is_blank_text(s: str) -> bool:
+def is_blank_text(s: Union[str, pd.Series, np.ndarray]) -> Union[bool, pd.Series, np.ndarray]:
+    """
+    test if s is na or blank string, a series or an array is tested element-wise and returns a bool mask
+    """
+    if isinstance(s, _TEXT_ARRAY_TYPES):
+        return _text_mask(s, is_blank_text,
+                          string_test=lambda x, na: na | (x.str.strip().str.len() == 0),
+                          number_test=lambda x, na: na)
     return pd.isna(s) or isinstance(s, str) and not s.strip()
 
-def is_non_blank_text(s: str) -> bool:
+def is_non_blank_text(s: Union[str, pd.Series, np.ndarray]) -> Union[bool, pd.Series, np.ndarray]:
+    """
+    test if s is not na and non-blank string, a series or an array is tested element-wise and returns a bool mask
+    """
+    if isinstance(s, _TEXT_ARRAY_TYPES):
+        return _text_mask(s, is_non_blank_text,
+                          string_test=lambda x, na: ~na & (x.str.strip().str.len() > 0),
+                          number_test=lambda x, na: pd.Series(False, index=x.index))
     return pd.notna(s) and isinstance(s, str) and s.strip()
 
 def join_values(values: Sequence[Any], sep=None) -> str:
@@ -264,14 +1419,86 @@ def join_values(values: Sequence[Any], sep=None) -> str:
         return str(values[0])
     return sep.join(map(str, values)) if sep else values
 
-def merge_dataframe_rows(data: pd.DataFrame, col_id='ID', na=None, join_sep=None, progress_bar=False) -> pd.DataFrame:
+def _merge_dataframe_rows_python(data: pd.DataFrame, col_id, na: set, join_sep=None, progress_bar=False):
+    counts = collections.defaultdict(lambda: collections.defaultdict(collections.Counter))
+    rows = iter_dataframe(data, progress_bar=progress_bar)
+    for i, row in rows:
+        eid = row[col_id]
+        for k, v in row.items():
+            if pd.notna(v) and v not in na:
+                counts[eid][k][v] += 1
+    result = []
+    for x in counts.values():
+        item = {col: join_values(list(values.keys()), sep=join_sep) for col, values in x.items()}
+        result.append(item)
+    return pd.DataFrame(result)
+
+def _merge_dataframe_rows_vectorized(data: pd.DataFrame, col_id, na: set, join_sep=None):
+    n = len(data)
+    if n == 0:
+        return pd.DataFrame()
+    # values are converted to a common type just like `data.iterrows()`
+    values = data.to_numpy()
+    positions = np.arange(n)
+
+    # values kept of every column
+    masks = []
+    for j in range(values.shape[1]):
+        mask = pd.notna(values[:, j])
+        if na:
+            mask &= ~pd.Series(values[:, j]).isin(na).to_numpy()
+        masks.append(mask)
+    kept = np.logical_or.reduce(masks) if masks else np.zeros(n, dtype=bool)
+
+    # every group is keyed by position of its first row with kept values, so that groups are sorted
+    # by first seen order, same as the python engine; rows with na id are merged into one group
+    codes, _ = pd.factorize(values[:, data.columns.get_loc(col_id)])
+    codes = np.where(codes < 0, codes.max() + 1, codes)
+    first = np.full(codes.max() + 1, n)
+    np.minimum.at(first, codes[kept], positions[kept])
+    keys = first[codes]
+
+    merged = {}
+    orders = []
+    for j, col in enumerate(data.columns):
+        column, mask = values[:, j], masks[j]
+        if not mask.any():
+            continue
+        # unique values of every group in first seen order
+        part_keys, part_values, part_positions = keys[mask], column[mask], positions[mask]
+        unique = ~pd.DataFrame({'key': part_keys, 'value': part_values}).duplicated().to_numpy()
+        part_keys, part_values, part_positions = part_keys[unique], part_values[unique], part_positions[unique]
+        order = np.argsort(part_keys, kind='stable')
+        part_keys, part_values = part_keys[order], part_values[order]
+        starts = np.flatnonzero(np.r_[True, part_keys[1:] != part_keys[:-1]])
+        ends = np.r_[starts[1:], len(part_keys)]
+        merged[col] = pd.Series([join_values(list(part_values[s:e]), sep=join_sep) for s, e in zip(starts, ends)],
+                                index=part_keys[starts])
+        # columns are ordered as they first appear in the first group has them
+        first_group = part_keys[0]
+        orders.append((first_group, part_positions[order][:ends[0]].min(), j, col))
+
+    if not merged:
+        return pd.DataFrame()
+    columns = [x[-1] for x in sorted(orders)]
+    index = sorted(set().union(*(x.index for x in merged.values())))
+    result = pd.DataFrame({col: merged[col].reindex(index) for col in columns}, columns=columns)
+    return result.reset_index(drop=True)
+
+MERGE_ENGINE = Literal['python', 'vectorized']
+
+def merge_dataframe_rows(data: pd.DataFrame, col_id='ID', na=None, join_sep=None, progress_bar=False,
+                         engine: MERGE_ENGINE = 'python') -> pd.DataFrame:
     """
     merge rows of same id to one row, similar to group by in sql
     :param data:            original data
     :param col_id:          column name for the id col
     :param na:              values to be treated as na
     :param join_sep:        seperator to join multi values
-    :param progress_bar:    passed to `iter_dataframe()`
+    :param progress_bar:    passed to `iter_dataframe()`, only used by the python engine
+    :param engine:          python:     iter every row, the original implementation
+                            vectorized: deduplicate and group values with pandas,
+                                        much faster on large data
     """
     if na is None:
         na = set()
@@ -279,15 +1506,9 @@ def merge_dataframe_rows(data: pd.DataFrame, col_id='ID', na=None, join_sep=None
         na = {na}
     else:
         na = set(na)
-    counts = collections.defaultdict(lambda: collections.defaultdict(collections.Counter))
-    rows = iter_dataframe(data, progress_bar=progress_bar)
-    for i, row in rows:
-        eid = row[col_id]
-        for k, v in row.items():
-            if pd.notna(v) and v not in na:
-                counts[eid][k][v] += 1
-    result = []
-    for x in counts.values():
-        item = {col: join_values(list(values.keys()), sep=join_sep) for col, values in x.items()}
-        result.append(item)
-    return pd.DataFrame(result)
+    if engine == 'python':
+        return _merge_dataframe_rows_python(data, col_id=col_id, na=na, join_sep=join_sep,
+                                            progress_bar=progress_bar)
+    if engine == 'vectorized':
+        return _merge_dataframe_rows_vectorized(data, col_id=col_id, na=na, join_sep=join_sep)
+    raise ValueError("Param 'engine' should be one of {'python', 'vectorized'}.")
@@ -1,6 +1,12 @@
+import itertools
+import collections.abc
 import pandas as pd
-from typing import Union, Iterable, Dict, Sequence, Any, List, Tuple
-from .dataframe import save_dataframe
+from typing import Union, Iterable, Dict, Sequence, Any, List, Tuple, Callable
+from .dataframe import save_dataframe, _select_columns
+
+# max rows of a sheet, including the header
+EXCEL_MAX_ROWS = 1048576
+_SHEET_NAME_MAX_LEN = 31
 
 def _save_excel(file, df, *args, **kwargs):
     # if df is a list of dataframe, then save each dataframe into a sheet
@@ -19,6 +25,139 @@ def _save_excel(file, df, *args, **kwargs):
     else:
         return save_dataframe(file, df, *args, **kwargs)
 
+def _iter_chunks(data, chunksize=10000) -> Iterable[pd.DataFrame]:
+    """
+    Convert data of a sheet to chunks, data can be a dataframe, chunks of dataframe, or rows.
+    """
+    if isinstance(data, pd.DataFrame):
+        yield data
+        return
+    if not isinstance(data, collections.abc.Iterator):
+        # such as a dict of columns, or a list of rows, same as the non-streaming mode
+        yield pd.DataFrame(data)
+        return
+    first = next(data, None)
+    if first is None:
+        return
+    data = itertools.chain([first], data)
+    if isinstance(first, pd.DataFrame):
+        yield from data
+        return
+    while True:
+        rows = list(itertools.islice(data, chunksize))
+        if not rows:
+            break
+        yield pd.DataFrame(rows)
+
+def _is_sheet_data(x) -> bool:
+    return isinstance(x, pd.DataFrame) or isinstance(x, collections.abc.Iterator)
+
+def _continuation_sheet_name(sheet_name: str, part: int) -> str:
+    if part == 1:
+        return sheet_name
+    suffix = f"_{part}"
+    return sheet_name[:_SHEET_NAME_MAX_LEN - len(suffix)] + suffix
+
+class _OpenpyxlStreamingBook(object):
+    def __init__(self, file):
+        from openpyxl import Workbook
+        # rows are written to temp files directly, instead of being kept in memory
+        self.file = file
+        self.book = Workbook(write_only=True)
+
+    def add_sheet(self, name: str) -> Callable[[Sequence[Any]], Any]:
+        return self.book.create_sheet(name).append
+
+    def close(self):
+        self.book.save(self.file)
+
+class _XlsxwriterStreamingBook(object):
+    def __init__(self, file):
+        import xlsxwriter
+        # rows are flushed to temp files once the next row is started
+        self.book = xlsxwriter.Workbook(file, {'constant_memory': True,
+                                               'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+
+    def add_sheet(self, name: str) -> Callable[[Sequence[Any]], Any]:
+        sheet = self.book.add_worksheet(name)
+        rows = itertools.count()
+        return lambda row: sheet.write_row(next(rows), 0, row)
+
+    def close(self):
+        self.book.close()
+
+_STREAMING_ENGINES = {
+    'xlsxwriter': _XlsxwriterStreamingBook,
+    'openpyxl': _OpenpyxlStreamingBook,
+}
+
+def _open_streaming_book(file, engine: str = None):
+    if engine:
+        if engine not in _STREAMING_ENGINES:
+            raise ValueError(f"Unsupported engine in streaming mode: {engine}")
+        return _STREAMING_ENGINES[engine](file)
+    # xlsxwriter is much faster if installed
+    try:
+        return _XlsxwriterStreamingBook(file)
+    except ImportError:
+        return _OpenpyxlStreamingBook(file)
+
+def _write_sheet_streaming(book, sheet_name: str, chunks: Iterable[pd.DataFrame],
+                           header: Union[Sequence[str], bool] = True, index=False, index_label=None,
+                           max_rows: int = None, **kwargs):
+    max_rows = max_rows or EXCEL_MAX_ROWS
+    # compatible for set index just use arg `index`
+    if index_label is None and isinstance(index, str):
+        index, index_label = True, index
+    append, rows, part, names = None, 0, 0, None
+    for df in chunks:
+        df = _select_columns(df, **kwargs)
+        if index:
+            if index_label is None:
+                # an index without name has an empty header, same as pandas
+                labels = ['' if x is None else x for x in df.index.names]
+            else:
+                labels = [index_label] if isinstance(index_label, str) else list(index_label)
+            df = df.reset_index()
+            df.columns = labels + list(df.columns[len(labels):])
+        if names is None:
+            names = list(header) if not isinstance(header, bool) else [str(x) or None for x in df.columns]
+        # convert by columns, and write na as empty cells
+        columns = [df.iloc[:, j].astype(object).where(df.iloc[:, j].notna(), None).tolist()
+                   for j in range(df.shape[1])]
+        for row in zip(*columns):
+            if append is None or rows >= max_rows:
+                # spill rows to a new sheet if the sheet is full
+                part += 1
+                append = book.add_sheet(_continuation_sheet_name(sheet_name, part))
+                rows = 0
+                if header is not False:
+                    append(names)
+                    rows += 1
+            append(row)
+            rows += 1
+    if append is None:
+        # keep an empty sheet, same as saving an empty dataframe
+        append = book.add_sheet(sheet_name)
+        if header is not False and names:
+            append(names)
+
+def _save_excel_streaming(file, df, *args, sheet_name='Sheet1', engine: str = None, **kwargs):
+    if args:
+        raise ValueError("Extra args are not supported in streaming mode.")
+    if isinstance(df, dict) and df and all(_is_sheet_data(x) for x in df.values()):
+        sheets = list(df.items())
+    elif isinstance(df, (list, tuple)) and df and all(_is_sheet_data(x) for x in df):
+        sheets = [(f"Sheet{i}", x) for i, x in enumerate(df, 1)]
+    else:
+        sheets = [(sheet_name, df)]
+    book = _open_streaming_book(file, engine=engine)
+    try:
+        for name, data in sheets:
+            _write_sheet_streaming(book, name, _iter_chunks(data), **kwargs)
+    finally:
+        book.close()
+
 _FILE_TYPES = Union[str, 'pd.WriteBuffer[bytes]', 'pd.WriteBuffer[str]']
 _DATA_TYPES = Union[
     pd.DataFrame, Iterable[Union[pd.Series, Dict[str, Any]]],
@@ -32,6 +171,7 @@ def save_excel(file: _FILE_TYPES, df: _DATA_TYPES,
                column_mapper: Union[Dict[str, str], Sequence[str]] = None,
                include_columns: Sequence[str] = None,
                exclude_columns: Sequence[str] = None,
+               streaming=False,
                **kwargs):
     """
     save data into file
@@ -46,8 +186,29 @@ def save_excel(file: _FILE_TYPES, df: _DATA_TYPES,
     :param column_mapper:       rename columns; if set, columns not list here will be ignored
     :param include_columns:     if set, columns not list here will be ignored
     :param exclude_columns:     if set, columns list here will be ignored
+    :param streaming:           write rows with constant memory, by the `constant_memory` mode of xlsxwriter
+                                if installed, or the write-only mode of openpyxl, set `engine` to choose one;
+                                data of a sheet can also be an iterator of dataframes;
+                                rows exceeding the limit of a sheet are spilled into continuation sheets,
+                                e.g. `Sheet1_2`; extra args and kwargs are not supported in this mode
     :param kwargs:              extra kwargs for df.to_xx()
     """
+    if streaming:
+        engine = kwargs.pop('engine', None)
+        if kwargs:
+            raise ValueError(f"Unsupported args in streaming mode: {list(kwargs)}")
+        _save_excel_streaming(
+            file, df, *args,
+            sheet_name=sheet_name,
+            header=header,
+            index=index,
+            index_label=index_label,
+            column_mapper=column_mapper,
+            include_columns=include_columns,
+            exclude_columns=exclude_columns,
+            engine=engine,
+        )
+        return
     _save_excel(
         file, df, *args,
         sheet_name=sheet_name,
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timing and memory instrumentation of processor runs, see `BaseProcessor.run(instrument=...)`.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Union, Iterable
+import os
+import sys
+import time
+import random
+import logging
+import threading
+import contextlib
+import tracemalloc
+import dataclasses
+from .io import ensure_parent_dir_exist
+from .json import save_json, get_json_backend
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+def _peak_rss() -> Optional[int]:
+    """
+    Peak resident memory of the current process in bytes, `None` if unknown.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def _cpu_time() -> float:
+    # finished child processes are included, such as workers of a process pool
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+def _size(data: Any) -> Optional[int]:
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+@dataclasses.dataclass
+class StageReport:
+    """
+    Measurement of a stage, summed up if the stage runs many times, such as in streaming mode.
+    """
+    name: str
+    calls: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    # peak resident memory of the process when the stage ends, in bytes
+    peak_rss: Optional[int] = None
+    # peak memory traced by `tracemalloc` during the stage, in bytes, only if `trace_memory` is set
+    peak_traced: Optional[int] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+
+    def add_rows(self, rows_in: int = None, rows_out: int = None):
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + rows_out
+
+@dataclasses.dataclass
+class LatencyReport:
+    """
+    Latency of `process_row()` calls in seconds, percentiles are computed on at most `max_samples` samples.
+    """
+    count: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+@dataclasses.dataclass
+class RunReport:
+    """
+    Report of a processor run.
+    """
+    processor: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss: Optional[int] = None
+    stages: Dict[str, StageReport] = dataclasses.field(default_factory=dict)
+    row_latency: Optional[LatencyReport] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    def summary(self) -> str:
+        """
+        A human readable summary in multi lines.
+        """
+        lines = [f"{self.processor}: wall {self.wall_time:.3f}s, cpu {self.cpu_time:.3f}s, "
+                 f"peak rss {_format_bytes(self.peak_rss)}"]
+        for x in self.stages.values():
+            line = f"  {x.name}: calls {x.calls}, wall {x.wall_time:.3f}s, cpu {x.cpu_time:.3f}s"
+            if x.rows_in is not None:
+                line += f", rows in {x.rows_in}"
+            if x.rows_out is not None:
+                line += f", rows out {x.rows_out}"
+            if x.peak_traced is not None:
+                line += f", peak traced {_format_bytes(x.peak_traced)}"
+            lines.append(line)
+        if self.row_latency is not None:
+            x = self.row_latency
+            lines.append(f"  process_row: count {x.count}, mean {x.mean * 1000:.3f}ms, "
+                         f"p50 {x.p50 * 1000:.3f}ms, p90 {x.p90 * 1000:.3f}ms, "
+                         f"p99 {x.p99 * 1000:.3f}ms, max {x.max * 1000:.3f}ms")
+        return '\n'.join(lines)
+
+def _format_bytes(n: Optional[int]) -> str:
+    if n is None:
+        return 'unknown'
+    for unit in ['B', 'KiB', 'MiB']:
+        if n < 1024:
+            return f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GiB"
+
+def _percentile(values: List[float], q: float) -> float:
+    # values should be sorted
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+class LoggingSink(object):
+    """
+    Log the summary of the report.
+    """
+
+    def __init__(self, logger: Union[str, logging.Logger] = 'feilian', level=logging.INFO):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+
+    def __call__(self, report: RunReport):
+        self.logger.log(self.level, report.summary())
+
+class JsonFileSink(object):
+    """
+    Save the report as a json file, or append to a jsonl file.
+    """
+
+    def __init__(self, filepath: str, jsonl=None):
+        self.filepath = filepath
+        self.jsonl = jsonl
+
+    def __call__(self, report: RunReport):
+        if self.jsonl or (self.jsonl is None and self.filepath.lower().endswith('.jsonl')):
+            ensure_parent_dir_exist(self.filepath)
+            with open(self.filepath, 'a', encoding='utf-8') as f:
+                f.write(get_json_backend().dumps(report.to_dict()) + '\n')
+        else:
+            save_json(self.filepath, report.to_dict())
+
+class Instrumentation(object):
+    """
+    Record wall time, cpu time, memory and row counts of every stage of a run,
+    and latency of `process_row()` calls.
+    Per row latency is only recorded in the current process, not in workers of a process pool.
+    """
+
+    def __init__(self, trace_memory=False, row_latency=True, max_samples=100000,
+                 sinks: Iterable[Callable[[RunReport], Any]] = ()):
+        """
+        :param trace_memory:    trace peak memory of every stage with `tracemalloc`, which slows the run a lot
+        :param row_latency:     record latency of `process_row()` calls
+        :param max_samples:     max latencies kept to compute percentiles, sampled randomly if exceeded
+        :param sinks:           called with the report when the run is finished,
+                                such as `LoggingSink()`, `JsonFileSink()`, or any function
+        """
+        self.trace_memory = trace_memory
+        self.row_latency = row_latency
+        self.max_samples = max_samples
+        self.sinks = list(sinks)
+        self.report: Optional[RunReport] = None
+        self._latencies: List[float] = []
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._random = random.Random(0)
+        # rows may be processed in a thread pool
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Measure a stage, yield the `StageReport` so that rows can be added.
+        """
+        stage = self.report.stages.get(name)
+        if stage is None:
+            stage = self.report.stages[name] = StageReport(name)
+        if self.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), _cpu_time()
+        try:
+            yield stage
+        finally:
+            stage.calls += 1
+            stage.wall_time += time.perf_counter() - wall
+            stage.cpu_time += _cpu_time() - cpu
+            stage.peak_rss = _peak_rss()
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                stage.peak_traced = max(stage.peak_traced or 0, peak)
+
+    def iter_stage(self, name: str, data: Iterable[Any]) -> Iterable[Any]:
+        """
+        Measure a stage which produces items lazily, such as reading chunks.
+        """
+        it = iter(data)
+        while True:
+            with self.stage(name) as stage:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    stage.calls -= 1
+                    return
+                stage.add_rows(rows_out=_size(item))
+            yield item
+
+    def add_row_latency(self, seconds: float):
+        with self._lock:
+            self._add_row_latency(seconds)
+
+    def _add_row_latency(self, seconds: float):
+        self._latency_count += 1
+        self._latency_sum += seconds
+        self._latency_max = max(self._latency_max, seconds)
+        if len(self._latencies) < self.max_samples:
+            self._latencies.append(seconds)
+        else:
+            # reservoir sampling, so that memory is bounded
+            i = self._random.randrange(self._latency_count)
+            if i < self.max_samples:
+                self._latencies[i] = seconds
+
+    def wrap_row_func(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wrap `process_row()` to record latency of every call.
+        """
+        if not self.row_latency:
+            return func
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add_row_latency(perf_counter() - start)
+        return wrapper
+
+    def wrap_async_row_func(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Same as `wrap_row_func()`, for an async `process_row()`.
+        """
+        if not self.row_latency:
+            return func
+        perf_counter = time.perf_counter
+
+        async def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add_row_latency(perf_counter() - start)
+        return wrapper
+
+    def _latency_report(self) -> Optional[LatencyReport]:
+        if not self._latency_count:
+            return None
+        values = sorted(self._latencies)
+        return LatencyReport(
+            count=self._latency_count,
+            mean=self._latency_sum / self._latency_count,
+            p50=_percentile(values, 0.5),
+            p90=_percentile(values, 0.9),
+            p99=_percentile(values, 0.99),
+            max=self._latency_max,
+        )
+
+    @contextlib.contextmanager
+    def run(self, processor: Any):
+        """
+        Measure a whole run, sinks are called at the end.
+        """
+        self.report = RunReport(type(processor).__name__)
+        self._latencies = []
+        self._latency_count = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        wall, cpu = time.perf_counter(), _cpu_time()
+        try:
+            yield self.report
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        self.report.wall_time = time.perf_counter() - wall
+        self.report.cpu_time = _cpu_time() - cpu
+        self.report.peak_rss = _peak_rss()
+        self.report.row_latency = self._latency_report()
+        for sink in self.sinks:
+            sink(self.report)
+
+    def __getstate__(self):
+        # recorded data is useless in workers of a process pool
+        state = self.__dict__.copy()
+        state.update(report=None, _latencies=[], sinks=[])
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+def _get_instrumentation(instrument: Union[bool, Instrumentation, None]) -> Optional[Instrumentation]:
+    if not instrument:
+        return None
+    if instrument is True:
+        return Instrumentation()
+    return instrument
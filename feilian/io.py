@@ -1,6 +1,192 @@
 # -*- coding: utf-8 -*-
 
+import io
 import os
+import shutil
+import tempfile
+import contextlib
+from typing import IO, Iterator, Optional, Sequence
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+
+COMPRESSION = Literal[None, 'infer', 'gzip', 'bz2', 'xz', 'zip']
+
+# magic bytes at the beginning of compressed files
+_COMPRESSION_MAGICS = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+]
+_COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zip': 'zip'}
 
 def ensure_parent_dir_exist(filepath: str):
     os.makedirs(os.path.abspath(os.path.dirname(filepath)), exist_ok=True)
+
+@contextlib.contextmanager
+def atomic_path(filepath: str, atomic=True) -> Iterator[str]:
+    """
+    Yield a temporary path to write, which replaces `filepath` after finished without error,
+    so that a failed or killed writer never leaves a truncated file.
+    The temporary file is in a hidden dir next to `filepath` with the same name,
+    so that the format and the compression can still be inferred by the name.
+    If `filepath` is a symlink, the file it points to is replaced, and the mode of an existing file is kept.
+    :param atomic:      if `False`, or `filepath` exists but is not a regular file, yield `filepath` itself
+    """
+    if not atomic or (os.path.exists(filepath) and not os.path.isfile(filepath)):
+        yield filepath
+        return
+    target = os.path.realpath(filepath)
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        tmp = os.path.join(tmp_dir, os.path.basename(filepath))
+        yield tmp
+        if os.path.exists(tmp):
+            if os.path.exists(target):
+                shutil.copymode(target, tmp)
+            os.replace(tmp, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _read_head(filepath: str, size=8) -> bytes:
+    with open(filepath, 'rb') as f:
+        return f.read(size)
+
+def detect_compression(filepath: str) -> Optional[str]:
+    """
+    Detect compression of a file by its magic bytes, `None` means not compressed.
+    Zip is not detected, since it's also the container of xlsx.
+    """
+    head = _read_head(filepath)
+    for magic, compression in _COMPRESSION_MAGICS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+def infer_compression(filepath: str) -> Optional[str]:
+    """
+    Infer compression of a file by its extension, `None` means not compressed.
+    """
+    return _COMPRESSION_EXTENSIONS.get(os.path.splitext(filepath)[1].lower())
+
+def open_file(filepath: str, mode='r', encoding='utf-8', newline=None, compression: COMPRESSION = 'infer') -> IO:
+    """
+    Open a file, compressed files are handled transparently.
+    :param filepath:    the file to open
+    :param mode:        mode for `open()`, text mode if 'b' not in it
+    :param encoding:    text encoding, ignored in binary mode
+    :param newline:     newline for `open()`, ignored in binary mode
+    :param compression:     'infer' means detect by magic bytes when reading, and by extension when writing
+    """
+    if compression == 'infer':
+        if 'r' in mode and '+' not in mode:
+            compression = detect_compression(filepath)
+        else:
+            compression = infer_compression(filepath)
+    if 'b' in mode:
+        encoding = newline = None
+    elif 't' not in mode:
+        mode += 't'
+    if not compression:
+        return open(filepath, mode.replace('t', ''), encoding=encoding, newline=newline)
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(filepath, mode, encoding=encoding, newline=newline)
+    if compression == 'bz2':
+        import bz2
+        return bz2.open(filepath, mode, encoding=encoding, newline=newline)
+    if compression == 'xz':
+        import lzma
+        return lzma.open(filepath, mode, encoding=encoding, newline=newline)
+    if compression == 'zip':
+        return _open_zip(filepath, mode, encoding=encoding, newline=newline)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+def _open_zip(filepath: str, mode: str, encoding=None, newline=None) -> IO:
+    import zipfile
+    if 'r' in mode:
+        archive = zipfile.ZipFile(filepath)
+        names = archive.namelist()
+        if len(names) != 1:
+            archive.close()
+            raise ValueError(f"Zip file should contain exactly one file: {filepath}")
+        stream = archive.open(names[0])
+    else:
+        # the only member is named as the file without the zip extension
+        name = os.path.basename(filepath)
+        if name.lower().endswith('.zip'):
+            name = name[:-4]
+        archive = zipfile.ZipFile(filepath, 'w', compression=zipfile.ZIP_DEFLATED)
+        stream = archive.open(name, 'w', force_zip64=True)
+    # close the archive together with the member
+    close = stream.close
+    def _close():
+        close()
+        archive.close()
+    stream.close = _close
+    if 'b' in mode:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+
+def strip_compression_extension(filepath: str) -> str:
+    """
+    Remove the compression extension of a file, e.g. `a.csv.gz` -> `a.csv`.
+    """
+    root, ext = os.path.splitext(filepath)
+    return root if ext.lower() in _COMPRESSION_EXTENSIONS else filepath
+
+def read_text_sample(filepath: str, size=65536, encoding='utf-8', compression: COMPRESSION = 'infer') -> str:
+    """
+    Read the beginning of a text file, compressed file is decompressed.
+    """
+    with open_file(filepath, 'rb', compression=compression) as f:
+        head = f.read(size)
+    # drop the incomplete char at the end
+    return head.decode(encoding, errors='ignore')
+
+def sniff_file_format(filepath: str) -> Optional[str]:
+    """
+    Guess format of a file by its content, may be: parquet, feather, xlsx, json, csv.
+    `None` means unknown, e.g. the file is empty.
+    """
+    head = _read_head(filepath, 8)
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    if head.startswith((b'ARROW1', b'FEA1')):
+        return 'feather'
+    if head.startswith(b'PK\x03\x04'):
+        import zipfile
+        with zipfile.ZipFile(filepath) as archive:
+            if '[Content_Types].xml' in archive.namelist():
+                return 'xlsx'
+    sample = read_text_sample(filepath, size=4096).lstrip('\ufeff \t\r\n')
+    if not sample:
+        return None
+    if sample[0] in '{[':
+        return 'json'
+    return 'csv'
+
+def sniff_delimiter(filepath: str, candidates: Sequence[str] = (',', '\t', ';', '|'),
+                    encoding='utf-8', preferred: str = None) -> Optional[str]:
+    """
+    Guess the delimiter of a csv file by its first line, the one appears most is selected.
+    `None` means none of the candidates appears.
+    :param preferred:   the expected delimiter, such as decided by the extension, it's kept if it appears
+                        in the first line, or another one doesn't appear the same times in every sampled line
+    """
+    sample = read_text_sample(filepath, size=65536, encoding=encoding).lstrip('\ufeff')
+    lines = sample.split('\n')
+    line = lines[0]
+    if preferred and preferred in line:
+        return preferred
+    counts = [(line.count(x), -i, x) for i, x in enumerate(candidates)]
+    count, _, delimiter = max(counts)
+    if preferred and count > 0:
+        # the last line may be truncated
+        rows = [x for x in lines[1:-1] if x.strip()][:100] or [x for x in lines[1:] if x.strip()]
+        if any(x.count(delimiter) != count for x in rows):
+            return preferred
+    return delimiter if count > 0 else None
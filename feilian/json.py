@@ -1,52 +1,347 @@
 # -*- coding: utf-8 -*-
 
-from typing import Dict, List, Union, Any
+from typing import Dict, List, Union, Any, Iterable, IO, Tuple, Optional, Callable
 import json
-from .io import ensure_parent_dir_exist
+import itertools
+from .io import ensure_parent_dir_exist, atomic_path, open_file, COMPRESSION
 
-def _read_json(filepath: str, jsonl: bool, encoding='utf-8', **kwargs):
+class JsonBackend(object):
     """
-    The actual read function.
+    A json library to parse and dump json, the default one is the standard library.
     """
-    with open(filepath, encoding=encoding) as f:
-        if jsonl:
-            return [json.loads(x, **kwargs) for x in f]
-        else:
-            return json.load(f, **kwargs)
+    name = 'json'
+
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        return json.loads(s, **kwargs)
+
+    def dumps(self, obj: Any, ensure_ascii=False, indent=None, **kwargs) -> str:
+        return json.dumps(obj, ensure_ascii=ensure_ascii, indent=indent, **kwargs)
+
+class OrjsonBackend(JsonBackend):
+    """
+    Use `orjson`, falls back to the standard library for args or values it doesn't support.
+    Notice that the output is compact without indent, and nan is dumped as `null`.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return self._orjson.loads(s)
+        except self._orjson.JSONDecodeError:
+            # maybe values such as `NaN` or big integers, which are accepted by the standard library
+            return super().loads(s)
+
+    def dumps(self, obj: Any, ensure_ascii=False, indent=None, **kwargs) -> str:
+        if kwargs or ensure_ascii or indent not in (None, 2):
+            return super().dumps(obj, ensure_ascii=ensure_ascii, indent=indent, **kwargs)
+        option = self._orjson.OPT_NON_STR_KEYS | self._orjson.OPT_SERIALIZE_NUMPY
+        if indent == 2:
+            option |= self._orjson.OPT_INDENT_2
+        try:
+            return self._orjson.dumps(obj, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, ensure_ascii=ensure_ascii, indent=indent)
+
+class UjsonBackend(JsonBackend):
+    """
+    Use `ujson`, falls back to the standard library for args it doesn't support.
+    Notice that the output is compact without indent.
+    """
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self._ujson.loads(s)
+
+    def dumps(self, obj: Any, ensure_ascii=False, indent=None, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, ensure_ascii=ensure_ascii, indent=indent, **kwargs)
+        return self._ujson.dumps(obj, ensure_ascii=ensure_ascii, indent=indent or 0, escape_forward_slashes=False)
+
+class _ParseOnlyBackend(JsonBackend):
+    """
+    Parse with another backend, but dump with the standard library.
+    Used when the backend is selected automatically, since output of other backends is different,
+    e.g. compact separators, nan dumped as `null`, and `1e-05` dumped as `0.00001`.
+    """
+
+    def __init__(self, backend: JsonBackend):
+        self.backend = backend
+        self.name = backend.name
+
+    def loads(self, s: Union[str, bytes], **kwargs) -> Any:
+        return self.backend.loads(s, **kwargs)
+
+# all known backends, by priority when selected automatically
+_json_backend_types: Dict[str, Callable[[], JsonBackend]] = {
+    'orjson': OrjsonBackend,
+    'ujson': UjsonBackend,
+    'json': JsonBackend,
+}
+_json_backends: Dict[str, JsonBackend] = {}
+_default_json_backend: Optional[str] = None
+
+def register_json_backend(name: str, backend: Union[JsonBackend, Callable[[], JsonBackend]]):
+    """
+    Register a json backend, it can be used by name later.
+    :param name:        name of the backend
+    :param backend:     a backend object, or a function to create it
+    """
+    _json_backends.pop(name, None)
+    if isinstance(backend, JsonBackend):
+        _json_backends[name] = backend
+    else:
+        _json_backend_types[name] = backend
+
+def set_json_backend(name: Optional[str]):
+    """
+    Set the default json backend, `None` means select the fastest installed one automatically.
+    """
+    global _default_json_backend
+    if name is not None:
+        get_json_backend(name)
+    _default_json_backend = name
+
+def get_json_backend(name: Union[str, JsonBackend] = None) -> JsonBackend:
+    """
+    Get a json backend by name, the default one if not given.
+    If selected automatically, the fastest installed one is used to parse,
+    while the standard library is always used to dump, so that output is not changed by installed libraries.
+    """
+    if isinstance(name, JsonBackend):
+        return name
+    name = name or _default_json_backend
+    if name is None:
+        # select the first installed one
+        for x in _json_backend_types:
+            try:
+                backend = get_json_backend(x)
+            except ImportError:
+                continue
+            return backend if type(backend) is JsonBackend else _ParseOnlyBackend(backend)
+    if name not in _json_backends:
+        if name not in _json_backend_types:
+            raise ValueError(f"Unknown json backend: {name}")
+        _json_backends[name] = _json_backend_types[name]()
+    return _json_backends[name]
 
 def _is_jsonl(filepath: str, jsonl=None) -> bool:
     if jsonl is None:
         jsonl = filepath.lower().endswith('.jsonl')
     return jsonl
 
-def read_json(filepath: str, jsonl=None, encoding='utf-8', **kwargs):
+def _loads_line(backend: JsonBackend, line: str, filepath: str, lineno: int, **kwargs) -> Any:
+    try:
+        return backend.loads(line, **kwargs)
+    except ValueError as e:
+        raise ValueError(f"Invalid json at line {lineno} of {filepath}: {e}") from e
+
+def _iter_lines(backend: JsonBackend, f: IO[str], filepath: str, start: int, **kwargs) -> Iterable[Any]:
+    loads = backend.loads
+    lineno = start - 1
+    try:
+        for lineno, line in enumerate(f, start):
+            if not line.isspace():
+                yield loads(line, **kwargs)
+    except ValueError as e:
+        raise ValueError(f"Invalid json at line {lineno} of {filepath}: {e}") from e
+
+# placeholder of a value not read
+_NOTHING = object()
+
+def _next_nonblank_line(f: IO[str], lineno: int, limit=-1) -> Tuple[str, str, int]:
     """
-    An agent for `json.load()` with some default value.
+    Read lines until a non-blank one.
+    :param limit:   max chars to read of a line, see `f.readline()`
+    :return:    all text read, the non-blank line, and its line number
     """
-    jsonl = _is_jsonl(filepath, jsonl)
+    text = ''
+    while True:
+        line = f.readline(limit)
+        if not line:
+            return text, '', lineno
+        lineno += 1
+        text += line
+        if line.strip():
+            return text, line, lineno
+
+def _is_truncated(line: str, limit: int) -> bool:
+    return 0 < limit <= len(line) and not line.endswith(('\n', '\r'))
+
+def _sniff_head(backend: JsonBackend, f: IO[str], limit=-1, **kwargs) -> Tuple[Optional[bool], str, Any, str, int]:
+    """
+    Decide the format by the first two non-blank lines, the shared sniffing logic of json files.
+    The file is jsonl only if more content follows a complete value in the first line.
+    :param limit:   max chars to read of a line, a longer first line is not parsed
+    :return:    jsonl format or not, `None` if unknown,
+                    i.e. the file is empty, has a single value in one line, or the first line is too long;
+                all text read before the second non-blank line;
+                the value of the first line, `_NOTHING` if not parsed;
+                the second non-blank line, empty if not exists;
+                line number of the second non-blank line
+    """
+    head, line, lineno = _next_nonblank_line(f, 0, limit)
+    if not line or _is_truncated(line, limit):
+        return None, head, _NOTHING, '', lineno
     try:
-        return _read_json(filepath, jsonl=jsonl, encoding=encoding, **kwargs)
-    except Exception as e:
-        # if failed, try again with different arg `jsonl`
-        try:
-            return _read_json(filepath, jsonl=not jsonl, encoding=encoding, **kwargs)
-        except Exception:
-            raise e
+        first = backend.loads(line, **kwargs)
+    except ValueError:
+        # the first line is not a whole json, so the file is a multi-line json
+        return False, head, _NOTHING, '', lineno
+    _, line, lineno = _next_nonblank_line(f, lineno, limit)
+    return (True if line else None), head, first, line, lineno
+
+def _sniff_json(filepath: str, encoding='utf-8', sample_size=65536) -> Tuple[Optional[bool], Any]:
+    """
+    Sniff the format by the beginning of the file.
+    :return:    jsonl format or not, `None` if unknown;
+                and the value if the file is a single value in one line, otherwise `_NOTHING`
+    """
+    try:
+        with open_file(filepath, encoding=encoding) as f:
+            jsonl, _, first, line, _ = _sniff_head(get_json_backend(), f, limit=sample_size)
+    except UnicodeDecodeError:
+        return None, _NOTHING
+    return jsonl, (first if jsonl is None else _NOTHING)
+
+def sniff_jsonl(filepath: str, sample_size=65536, encoding='utf-8') -> Optional[bool]:
+    """
+    Guess if a json file is jsonl format by the first lines, same as the way `read_json()` decides.
+    `None` means unknown, e.g. the file is a single json value in one line, or the first line is too long.
+    """
+    return _sniff_json(filepath, encoding=encoding, sample_size=sample_size)[0]
+
+def _load_json(backend: JsonBackend, f: IO[str], filepath: str, jsonl=None, **kwargs) -> Tuple[bool, Any]:
+    """
+    Sniff the format by the first lines, then parse the file only once.
+    :param jsonl:   format to use if the file is a single json value in one line,
+                    decided by the extension if not set
+    :return:    jsonl format or not, and the data;
+                for jsonl format, data is an iterator of all lines
+    """
+    sniffed, head, first, line, lineno = _sniff_head(backend, f, **kwargs)
+    if sniffed is False:
+        return False, backend.loads(head + f.read(), **kwargs)
+    if first is _NOTHING:
+        # empty file, no line at all
+        return True, iter([])
+    if not line:
+        # only a single json value
+        if _is_jsonl(filepath, jsonl):
+            return True, iter([first])
+        return False, first
+    second = _loads_line(backend, line, filepath, lineno, **kwargs)
+    return True, itertools.chain([first, second], _iter_lines(backend, f, filepath, lineno + 1, **kwargs))
+
+def iter_json(filepath: str, jsonl=None, encoding='utf-8', backend: Union[str, JsonBackend] = None,
+              **kwargs) -> Iterable[Any]:
+    """
+    Iter items of a json file lazily, compressed file is supported.
+    Lines of jsonl format are parsed one by one, errors are reported with line numbers;
+    for json format, items of a list are yielded, or the whole value if it's not a list.
+    :param filepath:    the file to read
+    :param jsonl:       format to use if the file is a single json value in one line
+    :param encoding:    text encoding
+    :param backend:     json backend to parse the file, see `get_json_backend()`
+    :param kwargs:      extra kwargs for `json.loads()`
+    """
+    backend = get_json_backend(backend)
+    with open_file(filepath, encoding=encoding) as f:
+        is_jsonl, data = _load_json(backend, f, filepath, jsonl=jsonl, **kwargs)
+        if is_jsonl or isinstance(data, list):
+            yield from data
+        else:
+            yield data
+
+def read_json(filepath: str, jsonl=None, encoding='utf-8', backend: Union[str, JsonBackend] = None, **kwargs):
+    """
+    An agent for `json.load()` with some default value.
+    Format is decided by sniffing the first lines, `jsonl` is only used if the file is a single json value in one line.
+    `backend` is the json backend to parse the file, see `get_json_backend()`.
+    """
+    backend = get_json_backend(backend)
+    with open_file(filepath, encoding=encoding) as f:
+        is_jsonl, data = _load_json(backend, f, filepath, jsonl=jsonl, **kwargs)
+        return list(data) if is_jsonl else data
+
+class JsonlWriter(object):
+    """
+    Write items into a jsonl file one by one.
+    """
+
+    def __init__(self, filepath: str, append=False, encoding='utf-8', newline='\n',
+                 ensure_ascii=False, compression: COMPRESSION = 'infer',
+                 backend: Union[str, JsonBackend] = None, **kwargs):
+        """
+        :param filepath:    the file to write
+        :param append:      append to the file or overwrite it
+        :param encoding:    text encoding
+        :param newline:     separator between lines
+        :param ensure_ascii:    `ensure_ascii` for `json.dumps()`
+        :param compression:     compression of the file, 'infer' means decide by the extension
+        :param backend:     json backend to dump items, see `get_json_backend()`
+        :param kwargs:      extra kwargs for `json.dumps()`
+        """
+        ensure_parent_dir_exist(filepath)
+        self.backend = get_json_backend(backend)
+        self.newline = newline
+        self.ensure_ascii = ensure_ascii
+        self.kwargs = kwargs
+        self._file = open_file(filepath, 'a' if append else 'w', encoding=encoding,
+                               newline='', compression=compression)
+
+    def write(self, item: Any):
+        self._file.write(self.backend.dumps(item, ensure_ascii=self.ensure_ascii, **self.kwargs))
+        self._file.write(self.newline)
+
+    def write_all(self, items: Iterable[Any]):
+        for x in items:
+            self.write(x)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'JsonlWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
-def save_json(filepath: str, data: Union[Dict[str, Any], List[Any]], jsonl=False,
-              encoding='utf-8', newline='\n', indent=2, ensure_ascii=False, **kwargs):
+def save_json(filepath: str, data: Union[Dict[str, Any], List[Any], Iterable[Any]], jsonl=False,
+              encoding='utf-8', newline='\n', indent=2, ensure_ascii=False,
+              backend: Union[str, JsonBackend] = None, atomic=True, **kwargs):
     """
     An agent for `json.dump()` with some default value.
+    For jsonl format, data can be any iterable and is written lazily.
+    `backend` is the json backend to dump data, see `get_json_backend()`.
+    With `atomic`, data is written to a temporary file, which is renamed to `filepath` after finished,
+    so that a failed or killed job never leaves a truncated file.
     """
+    backend = get_json_backend(backend)
     jsonl = _is_jsonl(filepath, jsonl)
-    if jsonl and not isinstance(data, list):
+    if jsonl and isinstance(data, (dict, str)):
         # data should be a list
         raise ValueError("data should be a list when save as jsonl format")
     ensure_parent_dir_exist(filepath)
-    with open(filepath, 'w', encoding=encoding, newline=newline) as f:
+    with atomic_path(filepath, atomic=atomic) as target:
         if jsonl:
-            for x in data:
-                f.write(json.dumps(x, ensure_ascii=ensure_ascii, **kwargs))
-                f.write(newline)
+            with JsonlWriter(target, encoding=encoding, newline=newline, ensure_ascii=ensure_ascii,
+                             backend=backend, **kwargs) as f:
+                f.write_all(data)
         else:
-            json.dump(data, f, indent=indent, ensure_ascii=ensure_ascii, **kwargs)
+            with open_file(target, 'w', encoding=encoding, newline=newline) as f:
+                f.write(backend.dumps(data, indent=indent, ensure_ascii=ensure_ascii, **kwargs))
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memoization of `DataframeProcessor.process_row()`, see `DataframeProcessor.memo_columns`.
+"""
+
+from typing import Any, Callable, Hashable, List, Optional, Sequence
+import copy
+import pickle
+import sqlite3
+import threading
+import collections
+import dataclasses
+import pandas as pd
+from .io import ensure_parent_dir_exist
+
+_MISSING = object()
+
+@dataclasses.dataclass
+class MemoStats:
+    hits: int = 0
+    misses: int = 0
+    # hits found in the persistent store, included in `hits`
+    disk_hits: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class _SqliteStore(object):
+    """
+    Persistent results in a sqlite file, keys are separated by namespace.
+    """
+
+    def __init__(self, filepath: str, namespace: str, batch_size=1000):
+        self.filepath = filepath
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self._conn: Optional[sqlite3.Connection] = None
+        # written in batches, key to pickled value
+        self._pending = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            ensure_parent_dir_exist(self.filepath)
+            # access is serialized by the lock of the memo
+            self._conn = sqlite3.connect(self.filepath, timeout=60, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS memo "
+                               "(namespace TEXT, key BLOB, value BLOB, PRIMARY KEY (namespace, key))")
+        return self._conn
+
+    def get(self, key: bytes) -> Any:
+        if key in self._pending:
+            return pickle.loads(self._pending[key])
+        row = self._connect().execute("SELECT value FROM memo WHERE namespace = ? AND key = ?",
+                                      (self.namespace, key)).fetchone()
+        return _MISSING if row is None else pickle.loads(row[0])
+
+    def put(self, key: bytes, value: Any):
+        self._pending[key] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO memo VALUES (?, ?, ?)",
+                             [(self.namespace, k, v) for k, v in self._pending.items()])
+        self._pending = {}
+
+    def clear(self):
+        self._pending = {}
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM memo WHERE namespace = ?", (self.namespace,))
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # the connection is opened again when used, such as in a worker process
+        self.flush()
+        state = self.__dict__.copy()
+        state.update(_conn=None, _pending={})
+        return state
+
+def _normalize_key_value(x: Any) -> Any:
+    # na values are not equal to themselves, so they can't be found in a dict
+    if (isinstance(x, float) and x != x) or x is pd.NA or x is pd.NaT:
+        return None
+    return x
+
+class RowMemo(object):
+    """
+    Results of rows by key, with a bounded LRU in memory and an optional persistent store.
+    """
+
+    def __init__(self, max_size=100000, filepath: str = None, namespace=''):
+        """
+        :param max_size:    max results kept in memory, the least recently used ones are dropped
+        :param filepath:    a sqlite file to keep results across runs
+        :param namespace:   separate results of different processors in the same file
+        """
+        if max_size <= 0:
+            raise ValueError("Param 'max_size' should be positive.")
+        self.max_size = max_size
+        self.stats = MemoStats()
+        self._cache = collections.OrderedDict()
+        self._store = _SqliteStore(filepath, namespace) if filepath else None
+        # rows may be processed in a thread pool
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Get the result of the key, `_MISSING` if not found.
+        """
+        with self._lock:
+            value = self._cache.get(key, _MISSING)
+            if value is not _MISSING:
+                self._cache.move_to_end(key)
+                self.stats.hits += 1
+                return value
+            if self._store is not None:
+                value = self._store.get(pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL))
+                if value is not _MISSING:
+                    self._put(key, value)
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    return value
+            self.stats.misses += 1
+            return _MISSING
+
+    def _put(self, key: Hashable, value: Any):
+        self._cache[key] = value
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._put(key, value)
+            if self._store is not None:
+                self._store.put(pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL), value)
+
+    def flush(self):
+        """
+        Write pending results to the persistent store.
+        """
+        if self._store is not None:
+            with self._lock:
+                self._store.flush()
+
+    def clear(self):
+        """
+        Remove all results, including the ones in the persistent store, and reset stats.
+        """
+        with self._lock:
+            self._cache.clear()
+            self.stats = MemoStats()
+            if self._store is not None:
+                self._store.clear()
+
+    def close(self):
+        if self._store is not None:
+            with self._lock:
+                self._store.close()
+
+    def wrap(self, func: Callable[[Hashable, Any], Any], key_func: Callable[[Any], Hashable]):
+        """
+        Wrap a row function, results are reused for rows with the same key.
+        A copy of the cached result is returned, so that it's safe to modify it.
+        """
+        def wrapper(i, row):
+            key = key_func(row)
+            try:
+                value = self.get(key)
+            except TypeError:
+                # unhashable key, such as a list value
+                return func(i, row)
+            if value is _MISSING:
+                value = func(i, row)
+                self.put(key, value)
+            return value if value is None else copy.copy(value)
+        return wrapper
+
+    def wrap_async(self, func: Callable[[Hashable, Any], Any], key_func: Callable[[Any], Hashable]):
+        """
+        Same as `wrap()`, for an async row function.
+        Rows with the same key running concurrently may be all processed.
+        """
+        async def wrapper(i, row):
+            key = key_func(row)
+            try:
+                value = self.get(key)
+            except TypeError:
+                return await func(i, row)
+            if value is _MISSING:
+                value = await func(i, row)
+                self.put(key, value)
+            return value if value is None else copy.copy(value)
+        return wrapper
+
+    def __getstate__(self):
+        # results in memory are not sent to worker processes
+        state = self.__dict__.copy()
+        state.update(_cache=collections.OrderedDict(), stats=MemoStats())
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+def _row_key_func(columns: Sequence[Hashable], key_columns: List[Hashable], row_format: str) -> Callable[[Any], tuple]:
+    """
+    Get values of key columns from a row in the type of `row_format`.
+    """
+    missing = [x for x in key_columns if x not in columns]
+    if missing:
+        raise ValueError(f"Memo columns not found in data: {missing}")
+    if row_format == 'namedtuple':
+        # fields of the namedtuple may be renamed, so get values by position
+        columns = list(columns)
+        keys = [columns.index(x) for x in key_columns]
+    else:
+        keys = list(key_columns)
+    return lambda row: tuple(_normalize_key_value(row[k]) for k in keys)
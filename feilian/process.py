@@ -1,19 +1,92 @@
+import os
 import abc
+import glob
+import asyncio
+import warnings
+import itertools
+import contextlib
 import tqdm
+import collections
 import pandas as pd
 from typing import (
     Any, Dict, Hashable, List,
     Tuple, Union, Iterable, Optional,
 )
+try:
+    from typing import Literal
+except ImportError:
+    from typing_extensions import Literal
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from .dataframe import (
     read_dataframe,
+    iter_read_dataframe,
     save_dataframe,
+    DataframeWriter,
+    _is_partitioned_dir,
 )
+from .instrument import Instrumentation, RunReport, _get_instrumentation, _size
+from .memo import RowMemo, _row_key_func
+from .checkpoint import Checkpoint, _input_signature
+
+PARALLEL_BACKEND = Literal['process', 'thread']
+
+# the processor used in a worker process
+_worker_processor = None
+
+def _init_worker(processor: 'BaseProcessor', setup=True):
+    global _worker_processor
+    _worker_processor = processor
+    if setup:
+        processor.setup_worker()
+
+def _process_in_worker(data: Any) -> Any:
+    return _worker_processor.process(data)
+
+def _read_in_worker(filepath: str) -> Any:
+    return _worker_processor.read_single_file(filepath)
+
+def _create_executor(processor: 'BaseProcessor', workers: int, backend: PARALLEL_BACKEND,
+                     setup=True) -> Executor:
+    if backend == 'process':
+        return ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(processor, setup))
+    if backend == 'thread':
+        return ThreadPoolExecutor(workers, initializer=processor.setup_worker if setup else None)
+    raise ValueError("Param 'backend' should be one of {'process', 'thread'}.")
 
 class BaseProcessor(abc.ABC):
     """
     Base class for processing data.
     """
+    # set while an instrumented run is in progress
+    _instrumentation: Optional[Instrumentation] = None
+
+    @contextlib.contextmanager
+    def _instrument(self, instrument: Union[bool, Instrumentation, None]):
+        """
+        Enable instrumentation for a run, yield `None` if not enabled.
+        """
+        if self._instrumentation is not None:
+            # nested in an instrumented run
+            yield self._instrumentation
+            return
+        instrumentation = _get_instrumentation(instrument)
+        if instrumentation is None:
+            yield None
+            return
+        self._instrumentation = instrumentation
+        try:
+            with instrumentation.run(self):
+                yield instrumentation
+        finally:
+            self._instrumentation = None
+
+    def _stage(self, name: str):
+        """
+        Measure a stage of the run, yield a `StageReport`, or `None` if not instrumented.
+        """
+        if self._instrumentation is None:
+            return contextlib.nullcontext()
+        return self._instrumentation.stage(name)
 
     @abc.abstractmethod
     def read_single_file(self, filepath: str) -> Any:
@@ -27,14 +100,58 @@ def merge_input_data(self, data: Iterable[Any]) -> Any:
         """
         return data
 
-    def read_data(self, filepath: Union[str, List[str], Tuple[str]]) -> Any:
+    def expand_input_path(self, filepath: Union[str, List[str], Tuple[str]]) -> Union[str, List[str]]:
         """
-        Read data from input file.
+        Expand glob patterns and directories in the input path to files.
+        A single file is kept as it is, otherwise a list of files is returned.
+        A directory with partitions like `col=value` is kept as a single input.
         """
         if isinstance(filepath, (list, tuple)):
-            return self.merge_input_data(self.read_single_file(x) for x in filepath)
+            files = []
+            for x in filepath:
+                x = self.expand_input_path(x)
+                files.extend([x] if isinstance(x, str) else x)
+            return files
+        if _is_partitioned_dir(filepath):
+            return filepath
+        if os.path.isdir(filepath):
+            return sorted(os.path.join(filepath, x) for x in os.listdir(filepath)
+                          if not x.startswith(('.', '_')) and os.path.isfile(os.path.join(filepath, x)))
+        # an existing file with a name like `data[1].csv` is not a pattern
+        if glob.has_magic(filepath) and not os.path.exists(filepath):
+            return sorted(x for x in glob.glob(filepath) if os.path.isfile(x) or _is_partitioned_dir(x))
+        return filepath
+
+    def _read_files_parallel(self, files: List[str], max_workers: int, backend: PARALLEL_BACKEND,
+                             keep_order: bool) -> Iterable[Any]:
+        func = _read_in_worker if backend == 'process' else self.read_single_file
+        with _create_executor(self, max_workers, backend, setup=False) as executor:
+            if keep_order:
+                yield from executor.map(func, files)
+            else:
+                for future in as_completed([executor.submit(func, x) for x in files]):
+                    yield future.result()
+
+    def read_data(self, filepath: Union[str, List[str], Tuple[str]], max_workers: int = None,
+                  backend: PARALLEL_BACKEND = 'thread', keep_order=True) -> Any:
+        """
+        Read data from input file.
+        :param filepath:        a file, a directory, a glob pattern, or a list of them
+        :param max_workers:     if greater than 1, read multi files in parallel
+        :param backend:         use a thread pool or a process pool to read files
+        :param keep_order:      whether to merge data in the order of files when reading in parallel
+        """
+        files = self.expand_input_path(filepath)
+        if isinstance(files, str):
+            return self.read_single_file(files)
+        if not files:
+            raise FileNotFoundError(f"No input file found: {filepath}")
+        if max_workers and max_workers > 1 and len(files) > 1:
+            data = self._read_files_parallel(files, max_workers=max_workers, backend=backend,
+                                             keep_order=keep_order)
         else:
-            return self.read_single_file(filepath)
+            data = (self.read_single_file(x) for x in files)
+        return self.merge_input_data(data)
 
     @abc.abstractmethod
     def save_result(self, filepath: str, result: Any):
@@ -48,52 +165,506 @@ def process(self, data: Any) -> Any:
         Process data and return result.
         """
 
-    def run(self, input_path: Union[str, List[str], Tuple[str]], output_path: str = None, write_output=True):
+    def split_data(self, data: Any, n: int) -> List[Any]:
+        """
+        Split data into at most `n` shards, required by parallel processing.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support parallel processing.")
+
+    def merge_results(self, results: List[Any]) -> Any:
+        """
+        Merge results of all shards, in the order of shards, required by parallel processing.
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support parallel processing.")
+
+    def setup_worker(self):
+        """
+        Called once in every worker before processing in parallel, e.g. to create connections.
+        """
+
+    def process_parallel(self, data: Any, workers: int, backend: PARALLEL_BACKEND = 'process',
+                         progress_bar: tqdm.tqdm = None, shards_per_worker=4, executor: Executor = None) -> Any:
+        """
+        Split data into shards, process shards in a pool, then merge results in the original order.
+        With the process backend, the processor should be picklable.
+        :param data:        data to be processed
+        :param workers:     number of workers
+        :param backend:     use a process pool or a thread pool
+        :param progress_bar:    updated with size of the shard after each shard is finished
+        :param shards_per_worker:   more shards means better balance and finer progress
+        :param executor:    a pool of `backend` to reuse, such as for chunks of a streaming run,
+                            it's not shut down after finished; a new one is created if not given
+        """
+        shards = self.split_data(data, workers * shards_per_worker)
+        owned = executor is None
+        if owned:
+            executor = _create_executor(self, workers, backend)
+        func = _process_in_worker if backend == 'process' else self.process
+        results = [None] * len(shards)
+        with executor if owned else contextlib.nullcontext():
+            futures = {executor.submit(func, shard): i for i, shard in enumerate(shards)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if progress_bar is not None:
+                    progress_bar.update(len(shards[i]) if hasattr(shards[i], '__len__') else 1)
+        if progress_bar is not None:
+            progress_bar.close()
+        return self.merge_results(results)
+
+    def run(self, input_path: Union[str, List[str], Tuple[str]], output_path: str = None, write_output=True,
+            workers: int = None, backend: PARALLEL_BACKEND = 'process',
+            instrument: Union[bool, Instrumentation] = None) -> Optional[RunReport]:
         """
         Read from a file, and save result to another file.
         :param input_path:      file with the data
         :param output_path:     where to save the result, if not given, use input_path
         :param write_output:    whether to write the result to the output_file
+        :param workers:         if greater than 1, process data in parallel with `process_parallel()`
+        :param backend:         use a process pool or a thread pool for parallel processing
+        :param instrument:      measure time, memory and rows of stages `read`, `process` and `save`,
+                                `True` or an `Instrumentation` with custom options and sinks
+        :return:    report of the run if instrumented, otherwise `None`
         """
-        data = self.read_data(input_path)
-        result = self.process(data)
-        if write_output:
-            self.save_result(output_path or input_path, result)
+        with self._instrument(instrument) as instrumentation:
+            with self._stage('read') as stage:
+                data = self.read_data(input_path)
+                if stage is not None:
+                    stage.add_rows(rows_out=_size(data))
+            with self._stage('process') as stage:
+                if workers and workers > 1:
+                    result = self.process_parallel(data, workers=workers, backend=backend)
+                else:
+                    result = self.process(data)
+                if stage is not None:
+                    stage.add_rows(rows_in=_size(data), rows_out=_size(result))
+            if write_output:
+                with self._stage('save') as stage:
+                    self.save_result(output_path or input_path, result)
+                    if stage is not None:
+                        stage.add_rows(rows_in=_size(result))
+        return None if instrumentation is None else instrumentation.report
+
+def _iter_row_values(data: pd.DataFrame, block_size=10000) -> Iterable[Tuple[Hashable, Tuple]]:
+    """
+    Iter index and values of rows, much faster than `data.iterrows()` and `data.itertuples()`.
+    Values are converted column by column in blocks, so that memory is bounded.
+    """
+    if data.shape[1] == 0:
+        yield from ((i, ()) for i in data.index)
+        return
+    for start in range(0, len(data), block_size):
+        block = data.iloc[start:start+block_size]
+        columns = [block.iloc[:, j].tolist() for j in range(block.shape[1])]
+        yield from zip(block.index, zip(*columns))
+
+ROW_FORMAT = Literal['series', 'dict', 'namedtuple']
 
 class DataframeProcessor(BaseProcessor, abc.ABC):
+    # columns needed by the processor, other columns are not read from the input files
+    input_columns: Optional[List[Hashable]] = None
+    # if set, results of `process_row()` are reused for rows with same values of these columns,
+    # so the result should only depend on these columns
+    memo_columns: Optional[List[Hashable]] = None
+
     def __init__(self, input_dtype=None, progress=False, read_args: Dict[str, Any] = None,
-                 write_args: Dict[str, Any] = None):
+                 write_args: Dict[str, Any] = None, row_format: ROW_FORMAT = 'series',
+                 read_workers: int = None, read_backend: PARALLEL_BACKEND = 'thread',
+                 keep_file_order=True, source_column: str = None,
+                 memo_size=100000, memo_path: str = None):
+        """
+        :param input_dtype:     `dtype` to read the input file
+        :param progress:        show a progress bar or not, a non-empty string will be used as the description
+        :param read_args:       extra args for `read_dataframe()`
+        :param write_args:      extra args for `save_dataframe()`
+        :param row_format:      type of the row passed to `process_row()`:
+                                    series:     `pd.Series`, the slowest one
+                                    dict:       a dict maps column name to value, much faster than series
+                                    namedtuple: a namedtuple created by `data.itertuples()`, the fastest one
+        :param read_workers:    if greater than 1, read multi input files in parallel
+        :param read_backend:    use a thread pool or a process pool to read files
+        :param keep_file_order: whether to keep rows in the order of files when reading in parallel
+        :param source_column:   if set, add a column with this name, the value is the file the row read from
+        :param memo_size:       max results of `process_row()` kept in memory, used if `memo_columns` is set
+        :param memo_path:       a sqlite file to keep results of `process_row()` across runs,
+                                used if `memo_columns` is set; remove it if `process_row()` is changed
+        """
+        if row_format not in ('series', 'dict', 'namedtuple'):
+            raise ValueError("Param 'row_format' should be one of {'series', 'dict', 'namedtuple'}.")
+        self.row_format = row_format
         self.progress = progress
         self.read_args = read_args or {}
         if input_dtype is not None:
             self.read_args['dtype'] = input_dtype
+        if self.input_columns is not None:
+            self.read_args.setdefault('columns', self.input_columns)
         self.write_args = write_args or {}
+        self.read_workers = read_workers
+        self.read_backend = read_backend
+        self.keep_file_order = keep_file_order
+        self.source_column = source_column
+        self.memo: Optional[RowMemo] = None
+        if self.memo_columns is not None:
+            self.memo = RowMemo(memo_size, filepath=memo_path, namespace=type(self).__qualname__)
 
     def read_single_file(self, filepath: str) -> pd.DataFrame:
-        return read_dataframe(filepath, **self.read_args)
+        df = read_dataframe(filepath, **self.read_args)
+        if self.source_column:
+            df[self.source_column] = filepath
+        return df
 
     def merge_input_data(self, data: Iterable[pd.DataFrame]) -> pd.DataFrame:
         return pd.concat(data)
 
-    def read_data(self, filepath: Union[str, List[str], Tuple[str]]) -> pd.DataFrame:
-        return super().read_data(filepath)
+    def read_data(self, filepath: Union[str, List[str], Tuple[str]], max_workers: int = None,
+                  backend: PARALLEL_BACKEND = None, keep_order: bool = None) -> pd.DataFrame:
+        return super().read_data(
+            filepath,
+            max_workers=self.read_workers if max_workers is None else max_workers,
+            backend=backend or self.read_backend,
+            keep_order=self.keep_file_order if keep_order is None else keep_order,
+        )
 
     def save_result(self, filepath: str, result: pd.DataFrame):
         save_dataframe(filepath, result, **self.write_args)
 
-    @abc.abstractmethod
-    def process_row(self, i: Hashable, row: pd.Series) -> Optional[Dict[str, Any]]:
+    def iter_rows(self, data: pd.DataFrame) -> Iterable[Tuple[Hashable, Any]]:
+        """
+        Iter rows of the data, each row is in the type of `row_format`.
         """
-        Process a single row of data.
+        if self.row_format == 'dict':
+            columns = list(data.columns)
+            return ((i, dict(zip(columns, x))) for i, x in _iter_row_values(data))
+        if self.row_format == 'namedtuple':
+            row_type = collections.namedtuple('Row', map(str, data.columns), rename=True)
+            return ((i, row_type._make(x)) for i, x in _iter_row_values(data))
+        return data.iterrows()
+
+    def process_row(self, i: Hashable, row: Union[pd.Series, Dict[str, Any], Tuple]) -> Optional[Dict[str, Any]]:
+        """
+        Process a single row of data, should be implemented if `process_batch()` is not.
+        :param i:       index of the row
+        :param row:     the row, type is decided by `row_format`
         :return:    if `None`, ignore this row
         """
+        raise NotImplementedError(f"{type(self).__name__} should implement `process_row()` or `process_batch()`.")
+
+    def split_data(self, data: pd.DataFrame, n: int) -> List[pd.DataFrame]:
+        size = max(1, -(-len(data) // n))
+        return [data.iloc[i:i+size] for i in range(0, len(data), size)]
+
+    def merge_results(self, results: List[pd.DataFrame]) -> pd.DataFrame:
+        if not results:
+            return pd.DataFrame()
+        # results of `process_row()` are indexed from 0 in every shard
+        ignore_index = all(isinstance(x.index, pd.RangeIndex) for x in results)
+        return pd.concat(results, ignore_index=ignore_index)
+
+    def _create_progress_bar(self, total: int = None) -> Optional[tqdm.tqdm]:
+        if not self.progress:
+            return None
+        desc = "process" if self.progress is True else self.progress
+        return tqdm.tqdm(total=total, desc=desc)
+
+    @contextlib.contextmanager
+    def _hide_progress(self):
+        # progress is shown by the caller for the whole data, parts should not show their own
+        progress, self.progress = self.progress, False
+        try:
+            yield
+        finally:
+            self.progress = progress
+
+    def process_parallel(self, data: pd.DataFrame, workers: int, backend: PARALLEL_BACKEND = 'process',
+                         progress_bar: tqdm.tqdm = None, shards_per_worker=4, executor: Executor = None) -> pd.DataFrame:
+        if progress_bar is None:
+            progress_bar = self._create_progress_bar(total=len(data))
+        with self._hide_progress():
+            return super().process_parallel(data, workers=workers, backend=backend, progress_bar=progress_bar,
+                                            shards_per_worker=shards_per_worker, executor=executor)
+
+    def process_batch(self, data: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Process all rows at once, override this to use vectorized operations.
+        :return:    if `None`, rows will be processed one by one with `process_row()`
+        """
+        return None
 
     def process(self, data: pd.DataFrame) -> pd.DataFrame:
-        bar = data.iterrows()
+        result = self.process_batch(data)
+        if result is not None:
+            return result
+        bar = self.iter_rows(data)
         if self.progress:
             desc = "process" if self.progress is True else self.progress
             bar = tqdm.tqdm(bar, total=len(data), desc=desc)
-        res = (self.process_row(i, row) for i, row in bar)
+        process_row = self.process_row
+        if self.memo is not None:
+            key_func = _row_key_func(data.columns, self.memo_columns, self.row_format)
+            process_row = self.memo.wrap(process_row, key_func)
+        if self._instrumentation is not None:
+            process_row = self._instrumentation.wrap_row_func(process_row)
+        res = (process_row(i, row) for i, row in bar)
         res = (x for x in res if x is not None)
-        return pd.DataFrame(res)
+        result = pd.DataFrame(res)
+        if self.memo is not None:
+            self.memo.flush()
+        return result
+
+    def iter_read_data(self, filepath: Union[str, List[str], Tuple[str]], chunksize: int) -> Iterable[pd.DataFrame]:
+        """
+        Read data from input files chunk by chunk.
+        `optimize_dtypes` in `read_args` is ignored, since dtypes of chunks may be different from each other.
+        """
+        files = self.expand_input_path(filepath)
+        if isinstance(files, str):
+            files = [files]
+        read_args = self.read_args
+        if read_args.get('optimize_dtypes'):
+            # dtypes optimized for every chunk may be different from each other
+            warnings.warn("Param 'optimize_dtypes' is ignored when reading as chunks.")
+            read_args = {k: v for k, v in read_args.items() if k != 'optimize_dtypes'}
+        for x in files:
+            for df in iter_read_dataframe(x, chunksize=chunksize, **read_args):
+                if self.source_column:
+                    df[self.source_column] = x
+                yield df
+
+    def run(self, input_path: Union[str, List[str], Tuple[str]], output_path: str = None, write_output=True,
+            workers: int = None, backend: PARALLEL_BACKEND = 'process', streaming=False, chunksize=10000,
+            instrument: Union[bool, Instrumentation] = None,
+            checkpoint_dir: str = None, resume=False) -> Optional[RunReport]:
+        """
+        Read from a file, and save result to another file.
+        See more arg docs in `BaseProcessor.run()`.
+        :param streaming:   if `True`, read, process and write data chunk by chunk, so that memory is bounded;
+                            output is same as the non-streaming run if every chunk gets same columns,
+                            and a column of integers gets no na values after the first chunk,
+                            otherwise integers written before are not written as float;
+                            `optimize_dtypes` in `read_args` is ignored, see `iter_read_data()`
+        :param chunksize:   rows of every chunk in streaming mode
+        :param checkpoint_dir:  if set, run in streaming mode, and save results of every chunk into this dir,
+                                the output is written from the saved results after all chunks are done
+        :param resume:      resume from the checkpoint in `checkpoint_dir`, chunks done are not processed again;
+                            input files, args and `chunksize` should be same as the previous run
+        """
+        if resume and not checkpoint_dir:
+            raise ValueError("Param 'checkpoint_dir' is required to resume a run.")
+        if not streaming and not checkpoint_dir:
+            return super().run(input_path, output_path, write_output=write_output, workers=workers, backend=backend,
+                               instrument=instrument)
+        with self._instrument(instrument) as instrumentation:
+            self._run_streaming(input_path, output_path, write_output=write_output, workers=workers,
+                                backend=backend, chunksize=chunksize, checkpoint_dir=checkpoint_dir, resume=resume)
+        return None if instrumentation is None else instrumentation.report
+
+    def _checkpoint_config(self, files: List[str], output_path: Optional[str], chunksize: int) -> Dict[str, Any]:
+        return {
+            'processor': type(self).__qualname__,
+            'input': _input_signature(files),
+            'output': output_path and os.path.abspath(output_path),
+            'chunksize': chunksize,
+            # args may not be json serializable
+            'read_args': repr(sorted(self.read_args.items(), key=lambda x: x[0])),
+            'source_column': self.source_column,
+        }
+
+    def _save_checkpoint_results(self, checkpoint: Checkpoint, output_path: str):
+        with self._stage('save') as stage:
+            with DataframeWriter(output_path, **self.write_args) as writer:
+                for result in checkpoint.iter_results():
+                    writer.write(result)
+            if stage is not None:
+                stage.add_rows(rows_in=writer.rows)
+
+    def _run_streaming(self, input_path: Union[str, List[str], Tuple[str]], output_path: Optional[str],
+                       write_output: bool, workers: Optional[int], backend: PARALLEL_BACKEND, chunksize: int,
+                       checkpoint_dir: str = None, resume=False):
+        output_path = output_path or input_path
+        if write_output and not isinstance(output_path, str):
+            raise ValueError("Output path should be a single file in streaming mode.")
+        files = self.expand_input_path(input_path)
+        files = [files] if isinstance(files, str) else files
+        if write_output and os.path.abspath(output_path) in map(os.path.abspath, files):
+            raise ValueError("Output file can't be same as input file in streaming mode.")
+
+        checkpoint = None
+        if checkpoint_dir:
+            checkpoint = Checkpoint(checkpoint_dir, self._checkpoint_config(
+                files, output_path if write_output else None, chunksize))
+            if not (resume and checkpoint.load()):
+                checkpoint.reset()
+            if checkpoint.finished:
+                return
+
+        bar = self._create_progress_bar()
+        # with a checkpoint, results of chunks are saved in it, and written to the output at last
+        writer = DataframeWriter(output_path, **self.write_args) if write_output and checkpoint is None else None
+        chunks = self.iter_read_data(input_path, chunksize=chunksize)
+        if checkpoint is not None and checkpoint.chunks:
+            # chunks done are still read to find the offset, but not processed again
+            chunks = itertools.islice(chunks, checkpoint.chunks, None)
+            if bar is not None:
+                bar.update(checkpoint.rows)
+        if self._instrumentation is not None:
+            chunks = self._instrumentation.iter_stage('read', chunks)
+        try:
+            with self._hide_progress():
+                # a single pool for all chunks, instead of creating one for every chunk
+                executor = _create_executor(self, workers, backend) if workers and workers > 1 else None
+                with executor or contextlib.nullcontext():
+                    for chunk in chunks:
+                        with self._stage('process') as stage:
+                            if executor is not None:
+                                result = self.process_parallel(chunk, workers=workers, backend=backend,
+                                                               executor=executor)
+                            else:
+                                result = self.process(chunk)
+                            if stage is not None:
+                                stage.add_rows(rows_in=len(chunk), rows_out=len(result))
+                        if checkpoint is not None:
+                            with self._stage('checkpoint') as stage:
+                                checkpoint.add(result, len(chunk))
+                                if stage is not None:
+                                    stage.add_rows(rows_in=len(result))
+                        elif writer is not None:
+                            with self._stage('save') as stage:
+                                writer.write(result)
+                                if stage is not None:
+                                    stage.add_rows(rows_in=len(result))
+                        if bar is not None:
+                            bar.update(len(chunk))
+            if checkpoint is not None:
+                if write_output:
+                    self._save_checkpoint_results(checkpoint, output_path)
+                checkpoint.finish()
+        except BaseException:
+            if writer is not None:
+                # keep the previous output file, instead of a truncated one
+                writer.discard()
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+            if bar is not None:
+                bar.close()
+
+class _RateLimiter(object):
+    """
+    Allow at most `rate` calls per second, calls are spaced evenly.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
 
+class AsyncDataframeProcessor(DataframeProcessor, abc.ABC):
+    """
+    Process rows concurrently with `async def process_row()`, for io bound work such as calling a web service.
+    Rows are processed in a single event loop, results are in the order of the input.
+    """
+
+    def __init__(self, *args, concurrency=10, rate_limit: float = None, retries=0, retry_delay=1.0,
+                 timeout: float = None, **kwargs):
+        """
+        See more arg docs in `DataframeProcessor.__init__()`.
+        :param concurrency:     max rows being processed at the same time
+        :param rate_limit:      max rows started per second, including retries
+        :param retries:         retry times of a row after `process_row()` raises an error or timeout,
+                                the error is raised if all retries failed
+        :param retry_delay:     seconds to wait before the first retry, doubled for every next retry
+        :param timeout:         max seconds of a single `process_row()` call
+        """
+        super().__init__(*args, **kwargs)
+        if concurrency < 1:
+            raise ValueError("Param 'concurrency' should be at least 1.")
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("Param 'rate_limit' should be positive.")
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+    async def process_row(self, i: Hashable, row: Union[pd.Series, Dict[str, Any], Tuple]) -> Optional[Dict[str, Any]]:
+        """
+        Process a single row of data, should be implemented if `process_batch()` is not.
+        :param i:       index of the row
+        :param row:     the row, type is decided by `row_format`
+        :return:    if `None`, ignore this row
+        """
+        raise NotImplementedError(f"{type(self).__name__} should implement `process_row()` or `process_batch()`.")
+
+    async def _call_row(self, i: Hashable, row: Any, limiter: Optional[_RateLimiter]) -> Optional[Dict[str, Any]]:
+        """
+        Call `process_row()` with rate limit, timeout and retries.
+        """
+        attempt = 0
+        while True:
+            if limiter is not None:
+                await limiter.wait()
+            try:
+                if self.timeout is None:
+                    return await self.process_row(i, row)
+                return await asyncio.wait_for(self.process_row(i, row), self.timeout)
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+            await asyncio.sleep(self.retry_delay * 2 ** attempt)
+            attempt += 1
+
+    async def process_async(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Same as `process()`, can be awaited in a running event loop.
+        """
+        result = self.process_batch(data)
+        if result is not None:
+            return result
+        limiter = None if self.rate_limit is None else _RateLimiter(self.rate_limit)
+
+        async def process_row(i, row):
+            return await self._call_row(i, row, limiter)
+        if self.memo is not None:
+            key_func = _row_key_func(data.columns, self.memo_columns, self.row_format)
+            process_row = self.memo.wrap_async(process_row, key_func)
+        if self._instrumentation is not None:
+            process_row = self._instrumentation.wrap_async_row_func(process_row)
+
+        bar = self._create_progress_bar(total=len(data))
+        rows = enumerate(self.iter_rows(data))
+        results = [None] * len(data)
+
+        async def worker():
+            # a fixed number of workers share the rows, so that tasks are not created for all rows at once
+            for k, (i, row) in rows:
+                results[k] = await process_row(i, row)
+                if bar is not None:
+                    bar.update(1)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.concurrency, max(1, len(data))))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for x in workers:
+                x.cancel()
+            if bar is not None:
+                bar.close()
+            if self.memo is not None:
+                self.memo.flush()
+        return pd.DataFrame(x for x in results if x is not None)
+
+    def process(self, data: pd.DataFrame) -> pd.DataFrame:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.process_async(data))
+        # already in a running event loop, such as in jupyter, so run in another thread
+        with ThreadPoolExecutor(1) as executor:
+            return executor.submit(asyncio.run, self.process_async(data)).result()
@@ -1,8 +1,240 @@
 # -*- coding: utf-8 -*-
 
+import os
+import stat
+import pytest
 import feilian
+import pandas as pd
 
 def test_read():
     input_file = 'a.csv'
     df = feilian.read_dataframe(input_file)
     print(df)
+
+def test_iter_read():
+    input_file = 'a.csv'
+    df = feilian.read_dataframe(input_file)
+    chunks = list(feilian.iter_read_dataframe(input_file, chunksize=2))
+    assert all(len(x) <= 2 for x in chunks)
+    assert pd.concat(chunks).equals(df)
+
+def test_writer(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    for ext in ['csv', 'tsv', 'jsonl']:
+        expected = tmp_path / f"expected.{ext}"
+        actual = tmp_path / f"actual.{ext}"
+        feilian.save_dataframe(str(expected), df)
+        with feilian.DataframeWriter(str(actual)) as writer:
+            for chunk in feilian.iter_read_dataframe('a.csv', chunksize=2):
+                writer.write(chunk)
+        assert expected.read_bytes() == actual.read_bytes()
+
+def test_merge_rows_engine():
+    df = pd.DataFrame([
+        {"a": "1", "b": "2", "c": "5"},
+        {"a": "2", "b": 6, "c": None, "d": "x"},
+        {"a": "1", "b": 8, "c": "9"},
+        {"a": "1", "b": 8, "c": "N/A"},
+    ])
+    for kwargs in [{}, {'join_sep': ','}, {'na': 'N/A', 'join_sep': '|'}]:
+        expected = feilian.merge_dataframe_rows(df, col_id='a', **kwargs)
+        actual = feilian.merge_dataframe_rows(df, col_id='a', engine='vectorized', **kwargs)
+        pd.testing.assert_frame_equal(expected, actual)
+    # rows with na id are merged into one row
+    df = pd.DataFrame({'ID': ['a', None, None], 'v': ['x', 'y', 'z']})
+    expected = feilian.merge_dataframe_rows(df, join_sep=',')
+    assert expected['v'].tolist() == ['x', 'y,z']
+    pd.testing.assert_frame_equal(expected, feilian.merge_dataframe_rows(df, join_sep=',', engine='vectorized'))
+    # groups start from the first row with values
+    df = pd.DataFrame({'ID': [None, 'b', None], 'v': [None, 'x', 'y']})
+    expected = feilian.merge_dataframe_rows(df)
+    assert list(expected.columns) == ['ID', 'v'] and expected['ID'].tolist()[0] == 'b'
+    pd.testing.assert_frame_equal(expected, feilian.merge_dataframe_rows(df, engine='vectorized'))
+
+def test_extract_sample():
+    df = pd.DataFrame({'a': range(100)})
+    sample = feilian.extract_dataframe_sample(df, lambda row: row['a'] % 2 == 0, size=10, shuffle=True,
+                                              random_state=1)
+    assert len(sample) == 10 and (sample['a'] % 2 == 0).all()
+    assert sample.equals(feilian.extract_dataframe_sample(df, lambda row: row['a'] % 2 == 0, size=10,
+                                                          shuffle=True, random_state=1))
+    sample = feilian.extract_dataframe_sample(df, lambda x: x['a'] % 2 == 0, size=10, shuffle=True,
+                                              vectorized=True, random_state=1)
+    assert len(sample) == 10 and (sample['a'] % 2 == 0).all()
+    sample = feilian.extract_dataframe_sample(df, df['a'] > 95)
+    assert sample['a'].tolist() == [96, 97, 98, 99]
+
+def test_text_mask():
+    s = pd.Series(['a', '', ' ', None, 0, 1.5, '\t b '], dtype=object)
+    for func in [feilian.is_empty_text, feilian.is_nonempty_text, feilian.is_blank_text, feilian.is_non_blank_text]:
+        assert func(s).tolist() == [bool(func(x)) for x in s]
+        assert func(s.dropna().astype(str)).tolist() == [bool(func(x)) for x in s.dropna().astype(str)]
+
+def test_optimize_dtypes():
+    df = pd.DataFrame({'a': [1, 2, 300], 'b': [-1, 0, 1], 'c': ['x', 'y', 'x'], 'd': [0.5, 1.5, 2.5]})
+    res = feilian.optimize_dataframe(df, category_threshold=0.7)
+    assert res['a'].dtype == 'uint16' and res['b'].dtype == 'int8'
+    assert res['c'].dtype == 'category' and res['d'].dtype == 'float64'
+    assert res.astype(df.dtypes.to_dict()).equals(df)
+    assert df['a'].dtype == 'int64'
+
+def test_columns_filters(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    expected = df[(df['a'] > 1) | (df['b'] == 'k1')][['a', 'c']]
+    for ext in ['csv', 'jsonl', 'parquet']:
+        file = str(tmp_path / f'a.{ext}')
+        feilian.save_dataframe(file, df)
+        filters = [[('a', '>', 1)], [('b', '=', 'k1')]]
+        res = feilian.read_dataframe(file, columns=['a', 'c'], filters=filters)
+        assert res.reset_index(drop=True).equals(expected.reset_index(drop=True))
+        res = pd.concat(feilian.iter_read_dataframe(file, chunksize=1, columns=['a', 'c'], filters=filters))
+        assert res.reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+def test_pyarrow_engine(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    for ext in ['csv', 'tsv', 'jsonl']:
+        file = str(tmp_path / f'a.{ext}')
+        feilian.save_dataframe(file, df, engine='pyarrow' if ext != 'jsonl' else None)
+        assert feilian.read_dataframe(file, engine='pyarrow').equals(df)
+
+def test_pyarrow_csv_same_as_pandas(tmp_path):
+    df = pd.DataFrame({
+        'int': [1, 2, 3],
+        'nullable_int': pd.array([1, None, 3], dtype='Int64'),
+        'float': [1.0, float('nan'), 1e-05],
+        'bool': [True, False, True],
+        'nullable_bool': pd.array([True, None, False], dtype='boolean'),
+        'str': ['a', None, ''],
+    })
+
+    def read_bytes(file):
+        with feilian.io.open_file(file, 'rb') as f:
+            return f.read()
+
+    for ext, compression in [('csv', None), ('tsv', None), ('csv', 'gzip')]:
+        a, b = str(tmp_path / f'a.{ext}'), str(tmp_path / f'b.{ext}')
+        feilian.save_dataframe(a, df, engine='pyarrow', compression=compression)
+        feilian.save_dataframe(b, df, compression=compression)
+        assert read_bytes(a) == read_bytes(b)
+    # fall back to pandas if values need to be quoted
+    df = df.assign(str=['a,b', 'c"d', 'e'])
+    a, b = str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')
+    with pytest.warns(UserWarning):
+        feilian.save_dataframe(a, df, engine='pyarrow')
+    feilian.save_dataframe(b, df)
+    assert read_bytes(a) == read_bytes(b)
+
+def test_feather(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    for ext, compression in [('feather', None), ('arrow', 'zstd')]:
+        file = str(tmp_path / f'a.{ext}')
+        feilian.save_dataframe(file, df, compression=compression)
+        assert feilian.read_dataframe(file).equals(df)
+        assert pd.concat(feilian.iter_read_dataframe(file, chunksize=2)).equals(df)
+        with feilian.DataframeWriter(file, compression=compression) as writer:
+            for chunk in feilian.iter_read_dataframe('a.csv', chunksize=2):
+                writer.write(chunk)
+        assert feilian.read_dataframe(file).equals(df)
+
+def test_partitioned(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    df['p'] = [i % 2 for i in range(len(df))]
+    path = str(tmp_path / 'data')
+    feilian.save_dataframe(path, df, partition_cols=['p'])
+    assert sorted(x.name for x in (tmp_path / 'data').iterdir()) == ['p=0', 'p=1']
+    res = feilian.read_dataframe(path).sort_values('a').reset_index(drop=True)
+    assert res.equals(df)
+    res = feilian.read_dataframe(path, filters=[('p', '=', 1)])
+    assert res.reset_index(drop=True).equals(df[df['p'] == 1].reset_index(drop=True))
+    # only partition columns are selected
+    for file_format in ['csv', 'jsonl', 'parquet']:
+        path = str(tmp_path / file_format)
+        feilian.save_dataframe(path, df, partition_cols=['p'], file_format=file_format)
+        res = feilian.read_dataframe(path, columns=['p'])
+        assert list(res.columns) == ['p'] and sorted(res['p'].tolist()) == sorted(df['p'].tolist())
+
+def test_read_cache(tmp_path):
+    file = tmp_path / 'a.csv'
+    cache_dir = str(tmp_path / 'cache')
+    df = feilian.read_dataframe('a.csv')
+    feilian.save_dataframe(str(file), df)
+    for _ in range(2):
+        assert feilian.read_dataframe(str(file), cache=True, cache_dir=cache_dir).equals(df)
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+    # changed file or args are not read from the old entry
+    feilian.save_dataframe(str(file), df.head(2))
+    assert feilian.read_dataframe(str(file), cache=True, cache_dir=cache_dir).equals(df.head(2))
+    assert feilian.read_dataframe(str(file), cache=True, cache_dir=cache_dir, nrows=1).equals(df.head(1))
+    assert len(list((tmp_path / 'cache').iterdir())) == 3
+    # entries of different json backends are separated
+    file = tmp_path / 'a.jsonl'
+    feilian.save_dataframe(str(file), df)
+    feilian.read_dataframe(str(file), cache=True, cache_dir=cache_dir, json_backend='json')
+    feilian.read_dataframe(str(file), cache=True, cache_dir=cache_dir)
+    assert len(list((tmp_path / 'cache').iterdir())) == 5
+    feilian.clear_dataframe_cache(str(file), cache_dir=cache_dir)
+    file = tmp_path / 'a.csv'
+    feilian.clear_dataframe_cache(str(file), cache_dir=cache_dir)
+    assert not list((tmp_path / 'cache').iterdir())
+
+def test_sniff_format(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    # tsv content with csv extension
+    feilian.save_dataframe(str(tmp_path / 'a.tsv'), df)
+    (tmp_path / 'a.tsv').rename(tmp_path / 'b.csv')
+    assert feilian.read_dataframe(str(tmp_path / 'b.csv')).equals(df)
+    # jsonl content with json extension
+    feilian.save_dataframe(str(tmp_path / 'a.jsonl'), df)
+    (tmp_path / 'a.jsonl').rename(tmp_path / 'b.json')
+    assert feilian.read_dataframe(str(tmp_path / 'b.json')).equals(df)
+    # compressed csv without compression extension, and unknown extension
+    feilian.save_dataframe(str(tmp_path / 'a.csv'), df, compression='gzip')
+    (tmp_path / 'a.csv').rename(tmp_path / 'b.data')
+    assert feilian.read_dataframe(str(tmp_path / 'b.data')).equals(df)
+
+def test_sniff_single_line_json(tmp_path):
+    df = pd.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})
+    # a dataframe saved as a single json object in one line
+    file = str(tmp_path / 'a.json')
+    feilian.save_dataframe(file, df, jsonl=False, orient='columns')
+    assert feilian.read_dataframe(file).shape == (3, 2)
+    assert feilian.read_json(file) == {'a': {'0': 1, '1': 2, '2': 3}, 'b': {'0': 'x', '1': 'y', '2': 'z'}}
+    # a single jsonl record with json extension
+    (tmp_path / 'b.json').write_text('{"a": 1, "b": "x"}\n')
+    assert feilian.read_dataframe(str(tmp_path / 'b.json')).equals(pd.DataFrame({'a': [1], 'b': ['x']}))
+    assert feilian.read_json(str(tmp_path / 'b.json')) == {'a': 1, 'b': 'x'}
+
+def test_sniff_delimiter(tmp_path):
+    # the delimiter of the extension is kept if it appears in the header
+    file = tmp_path / 'a.tsv'
+    file.write_text('name\tprice, usd\nx\t1\n')
+    for file_format in [None, 'tsv']:
+        assert list(feilian.read_dataframe(str(file), file_format=file_format).columns) == ['name', 'price, usd']
+    file = tmp_path / 'b.tsv'
+    file.write_text('amount, usd\n1\n')
+    assert list(feilian.read_dataframe(str(file)).columns) == ['amount, usd']
+    # switched if only another delimiter appears
+    file = tmp_path / 'c.tsv'
+    file.write_text('a,b\n1,2\n')
+    assert list(feilian.read_dataframe(str(file)).columns) == ['a', 'b']
+
+def test_atomic_write(tmp_path):
+    file = tmp_path / 'a.csv'
+    file.write_text('old')
+    rows = ({'a': i} if i < 3 else 1 / 0 for i in range(5))
+    with pytest.raises(ZeroDivisionError):
+        feilian.save_json(str(file), rows, jsonl=True)
+    assert file.read_text() == 'old'
+    assert [x.name for x in tmp_path.iterdir()] == ['a.csv']
+    feilian.save_dataframe(str(file), pd.DataFrame({'a': [1]}))
+    assert file.read_text() == 'a\n1\n'
+    # append to the existing file
+    feilian.save_dataframe(str(file), pd.DataFrame({'a': [2, 3]}), mode='a', header=False)
+    assert file.read_text() == 'a\n1\n2\n3\n'
+    # keep the mode, and replace the file which the link points to
+    os.chmod(file, 0o600)
+    link = tmp_path / 'b.csv'
+    link.symlink_to(file)
+    feilian.save_dataframe(str(link), pd.DataFrame({'a': [4]}))
+    assert link.is_symlink() and file.read_text() == 'a\n4\n'
+    assert stat.S_IMODE(os.stat(file).st_mode) == 0o600
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import feilian
+import feilian.excel
+import pandas as pd
+
+def test_save_excel_streaming(tmp_path, monkeypatch):
+    df = feilian.read_dataframe('a.csv')
+    file = str(tmp_path / 'a.xlsx')
+    feilian.save_excel(file, {'A': df, 'B': df.head(2)}, streaming=True)
+    res = pd.read_excel(file, sheet_name=None)
+    assert res['A'].equals(df) and res['B'].equals(df.head(2))
+
+    # a dict of columns, same as the non-streaming mode
+    data = {'a': [1, 2], 'b': [3, 4]}
+    feilian.save_excel(file, data, streaming=True)
+    assert pd.read_excel(file).equals(pd.DataFrame(data))
+
+    # an index without name has an empty header
+    for engine in ['xlsxwriter', 'openpyxl']:
+        feilian.save_excel(file, df, streaming=True, index=True, engine=engine)
+        assert list(pd.read_excel(file).columns) == ['Unnamed: 0'] + list(df.columns)
+
+    # a str index is used as the header of the index
+    feilian.save_excel(file, df.set_index('a'), streaming=True, index='id')
+    assert list(pd.read_excel(file).columns) == ['id'] + list(df.columns[1:])
+
+    # rows exceeding the limit are spilled into continuation sheets
+    monkeypatch.setattr(feilian.excel, 'EXCEL_MAX_ROWS', 3)
+    chunks = (df.iloc[i:i+2] for i in range(0, len(df), 2))
+    feilian.save_excel(file, chunks, streaming=True, engine='openpyxl')
+    res = pd.read_excel(file, sheet_name=None)
+    assert list(res) == ['Sheet1', 'Sheet1_2']
+    assert pd.concat(res.values(), ignore_index=True).equals(df)
+
+def test_read_excel(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    file = str(tmp_path / 'a.xlsx')
+    feilian.save_excel(file, {'A': df, 'B': df.head(2)})
+    chunks = list(feilian.iter_read_dataframe(file, chunksize=3))
+    assert [len(x) for x in chunks] == [3, 1]
+    assert pd.concat(chunks).equals(df)
+    res = feilian.read_dataframe(file, sheet_name=None, sheet_workers=2)
+    assert list(res) == ['A', 'B'] and res['A'].equals(df) and res['B'].equals(df.head(2))
+
+def test_iter_read_excel_irregular(tmp_path):
+    from openpyxl import Workbook
+    file = str(tmp_path / 'a.xlsx')
+    book = Workbook()
+    # duplicate header names, and rows wider than the header
+    for row in [['a', 'a', None, 'b'], [1, 2, 3, 4], [None] * 6, [5, 6, 7, 8, 9], [1]]:
+        book.active.append(row)
+    book.save(file)
+    for engine in ['openpyxl', 'calamine']:
+        expected = pd.read_excel(file, engine=engine)
+        assert list(expected.columns) == ['a', 'a.1', 'Unnamed: 2', 'b', 'Unnamed: 4']
+        actual = pd.concat(feilian.iter_read_dataframe(file, chunksize=2, engine=engine))
+        pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import feilian
+
+def test_read_json(tmp_path):
+    data = [{"a": 1, "b": "中文"}, {"a": 2, "b": None}]
+    for name in ['a.json', 'a.jsonl', 'a.jsonl.gz']:
+        feilian.save_json(str(tmp_path / name), data)
+        assert feilian.read_json(str(tmp_path / name)) == data
+        assert list(feilian.iter_json(str(tmp_path / name))) == data
+    # format is decided by content, not by extension
+    (tmp_path / 'a.jsonl').rename(tmp_path / 'b.json')
+    assert feilian.read_json(str(tmp_path / 'b.json')) == data
+
+def test_jsonl_writer(tmp_path):
+    filepath = str(tmp_path / 'a.jsonl')
+    with feilian.JsonlWriter(filepath) as writer:
+        writer.write({"a": 1})
+    with feilian.JsonlWriter(filepath, append=True) as writer:
+        writer.write_all([{"a": 2}, {"a": 3}])
+    assert feilian.read_json(filepath) == [{"a": 1}, {"a": 2}, {"a": 3}]
+    with open(filepath, 'a') as f:
+        f.write('{"a": \n')
+    with pytest.raises(ValueError, match='line 4'):
+        list(feilian.iter_json(filepath))
+
+def test_json_backend(tmp_path):
+    data = {"a": [1, 2.5, None], "b": "中文"}
+    expected = tmp_path / 'expected.json'
+    feilian.save_json(str(expected), data, backend='json')
+    for backend in ['orjson', 'ujson']:
+        try:
+            feilian.get_json_backend(backend)
+        except ImportError:
+            continue
+        actual = tmp_path / f"{backend}.json"
+        feilian.save_json(str(actual), data, backend=backend)
+        assert feilian.read_json(str(actual), backend=backend) == data
+        assert expected.read_bytes() == actual.read_bytes()
+
+def test_json_backend_default_output(tmp_path):
+    # output of the automatically selected backend is same as the standard library
+    data = [{"x": float('nan'), "t": 1.0, "s": 1e-05, "b": 1e+20, "c": "中文"}]
+    for name, jsonl in [('a.json', False), ('a.jsonl', True)]:
+        expected = tmp_path / f"expected-{name}"
+        actual = tmp_path / name
+        feilian.save_json(str(expected), data, jsonl=jsonl, backend='json')
+        feilian.save_json(str(actual), data, jsonl=jsonl)
+        assert expected.read_bytes() == actual.read_bytes()
+    assert (tmp_path / 'a.jsonl').read_text(encoding='utf-8') == \
+        '{"x": NaN, "t": 1.0, "s": 1e-05, "b": 1e+20, "c": "中文"}\n'
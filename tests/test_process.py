@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+import time
+import asyncio
+import threading
+import http.server
+import pytest
+import feilian
+import pandas as pd
+
+class DoubleProcessor(feilian.DataframeProcessor):
+    def process_row(self, i, row):
+        if self.row_format == 'namedtuple':
+            return {'a': row.a * 2, 'b': row.b}
+        return {'a': row['a'] * 2, 'b': row['b']}
+
+class BatchDoubleProcessor(feilian.DataframeProcessor):
+    def process_batch(self, data):
+        return pd.DataFrame({'a': data['a'] * 2, 'b': data['b']}).reset_index(drop=True)
+
+def test_row_format():
+    df = feilian.read_dataframe('a.csv')
+    expected = DoubleProcessor().process(df)
+    for row_format in ['dict', 'namedtuple']:
+        assert DoubleProcessor(row_format=row_format).process(df).equals(expected)
+    assert BatchDoubleProcessor().process(df).equals(expected)
+    with pytest.raises(NotImplementedError, match='process_row'):
+        feilian.DataframeProcessor().process(df)
+
+def test_parallel(tmp_path):
+    df = pd.concat([feilian.read_dataframe('a.csv')] * 50, ignore_index=True)
+    processor = DoubleProcessor(row_format='dict')
+    expected = processor.process(df)
+    for backend in ['thread', 'process']:
+        assert processor.process_parallel(df, workers=2, backend=backend).equals(expected)
+    output_file = tmp_path / 'output.csv'
+    processor.run('a.csv', str(output_file), workers=2)
+    assert feilian.read_dataframe(str(output_file)).equals(processor.process(feilian.read_dataframe('a.csv')))
+
+def test_read_multi_files(tmp_path):
+    df = feilian.read_dataframe('a.csv')
+    for i in range(3):
+        feilian.save_dataframe(str(tmp_path / f"part-{i}.csv"), df.assign(part=i))
+    processor = DoubleProcessor(read_workers=2, source_column='source_file')
+    data = processor.read_data(str(tmp_path / "part-*.csv"))
+    assert data['part'].tolist() == [0] * len(df) + [1] * len(df) + [2] * len(df)
+    assert data['source_file'].tolist() == [str(tmp_path / f"part-{i}.csv") for i in range(3) for _ in range(len(df))]
+    assert processor.read_data(str(tmp_path), backend='process').equals(data)
+    # an existing file with glob characters in its name
+    feilian.save_dataframe(str(tmp_path / 'data[1].csv'), df)
+    assert processor.read_data(str(tmp_path / 'data[1].csv')).drop(columns='source_file').equals(df)
+
+class LateValueProcessor(feilian.DataframeProcessor):
+    def process_row(self, i, row):
+        return {'a': row['a'], 'v': row['a'] if row['a'] > 2 else None}
+
+class LateNaProcessor(feilian.DataframeProcessor):
+    def process_row(self, i, row):
+        return {'a': row['a'], 'v': None if row['a'] == 3 else row['a']}
+
+class CountingProcessor(DoubleProcessor):
+    workers = 0
+
+    def setup_worker(self):
+        self.workers += 1
+
+def test_streaming(tmp_path):
+    processor = DoubleProcessor(row_format='dict')
+    expected = tmp_path / 'expected.csv'
+    actual = tmp_path / 'actual.csv'
+    processor.run('a.csv', str(expected))
+    processor.run('a.csv', str(actual), streaming=True, chunksize=2)
+    assert expected.read_bytes() == actual.read_bytes()
+    # dtypes are not optimized for chunks
+    processor = DoubleProcessor(row_format='dict', read_args={'optimize_dtypes': True})
+    with pytest.warns(UserWarning, match='optimize_dtypes'):
+        processor.run('a.csv', str(actual), streaming=True, chunksize=2)
+    assert expected.read_bytes() == actual.read_bytes()
+    # integers are written as float after na values, same as the non-streaming run
+    processor = LateValueProcessor(row_format='dict')
+    processor.run('a.csv', str(expected))
+    processor.run('a.csv', str(actual), streaming=True, chunksize=2)
+    assert expected.read_bytes() == actual.read_bytes() == b'a,v\n1,\n2,\n3,3.0\n4,4.0\n'
+    # but integers written before na values are kept
+    processor = LateNaProcessor(row_format='dict')
+    processor.run('a.csv', str(actual), streaming=True, chunksize=2)
+    assert actual.read_bytes() == b'a,v\n1,1\n2,2\n3,\n4,4.0\n'
+    # a single pool is used for all chunks
+    processor = CountingProcessor(row_format='dict')
+    processor.run('a.csv', str(actual), streaming=True, chunksize=1, workers=2, backend='thread')
+    assert processor.workers <= 2
+
+def test_instrument(tmp_path):
+    reports = []
+    instrumentation = feilian.Instrumentation(trace_memory=True, sinks=[
+        reports.append, feilian.JsonFileSink(str(tmp_path / 'report.json')),
+    ])
+    processor = DoubleProcessor(row_format='dict')
+    df = feilian.read_dataframe('a.csv')
+    report = processor.run('a.csv', str(tmp_path / 'output.csv'), instrument=instrumentation)
+    assert reports == [report]
+    assert list(report.stages) == ['read', 'process', 'save']
+    assert report.stages['read'].rows_out == len(df)
+    assert report.stages['process'].rows_in == report.stages['save'].rows_in == len(df)
+    assert report.stages['process'].peak_traced > 0
+    assert report.row_latency.count == len(df)
+    assert report.row_latency.p50 <= report.row_latency.p99 <= report.row_latency.max
+    assert feilian.read_json(str(tmp_path / 'report.json'))['stages']['save']['calls'] == 1
+    report = processor.run('a.csv', str(tmp_path / 'output.csv'), streaming=True, chunksize=2, instrument=True)
+    assert report.stages['read'].calls == report.stages['save'].calls == -(-len(df) // 2)
+    assert report.stages['save'].rows_in == len(df)
+    assert processor.run('a.csv', str(tmp_path / 'output.csv')) is None
+
+class MemoProcessor(feilian.DataframeProcessor):
+    memo_columns = ['b']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def process_row(self, i, row):
+        self.calls += 1
+        return {'b': row['b'], 'c': str(row['b']) * 2}
+
+def test_memo(tmp_path):
+    df = pd.DataFrame({'a': range(6), 'b': ['x', 'y', 'x', None, 'x', None]})
+    processor = MemoProcessor(row_format='dict', memo_size=1, memo_path=str(tmp_path / 'memo.db'))
+    expected = pd.DataFrame([{'b': x, 'c': str(x) * 2} for x in df['b']])
+    assert processor.process(df).equals(expected)
+    # only one result in memory, others are found in the store
+    assert processor.calls == 3
+    assert (processor.memo.stats.hits, processor.memo.stats.misses, processor.memo.stats.disk_hits) == (3, 3, 3)
+    processor = MemoProcessor(row_format='namedtuple', memo_path=str(tmp_path / 'memo.db'))
+    assert processor.process(df).equals(expected)
+    assert processor.calls == 0
+    assert processor.memo.stats.disk_hits == 3
+    processor.memo.clear()
+    assert MemoProcessor(memo_path=str(tmp_path / 'memo.db')).memo.get(('x',)) is feilian.memo._MISSING
+
+class FailingProcessor(DoubleProcessor):
+    def __init__(self, fail_at=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_at = fail_at
+        self.rows = 0
+
+    def process_row(self, i, row):
+        if self.rows == self.fail_at:
+            raise RuntimeError("killed")
+        self.rows += 1
+        return super().process_row(i, row)
+
+def test_checkpoint(tmp_path):
+    expected = tmp_path / 'expected.csv'
+    actual = tmp_path / 'actual.csv'
+    checkpoint_dir = str(tmp_path / 'checkpoint')
+    DoubleProcessor(row_format='dict').run('a.csv', str(expected))
+    actual.write_text('old')
+    processor = FailingProcessor(fail_at=3, row_format='dict')
+    with pytest.raises(RuntimeError):
+        processor.run('a.csv', str(actual), chunksize=2, checkpoint_dir=checkpoint_dir)
+    # output is not touched by the failed run
+    assert actual.read_text() == 'old'
+    processor = FailingProcessor(row_format='dict')
+    processor.run('a.csv', str(actual), chunksize=2, checkpoint_dir=checkpoint_dir, resume=True)
+    # only the last chunk is processed
+    assert processor.rows == 2
+    assert expected.read_bytes() == actual.read_bytes()
+    assert feilian.read_json(str(tmp_path / 'checkpoint' / 'state.json'))['finished']
+    processor.run('a.csv', str(actual), chunksize=2, checkpoint_dir=checkpoint_dir, resume=True)
+    assert processor.rows == 2
+    with pytest.raises(ValueError, match='another run'):
+        processor.run('a.csv', str(actual), chunksize=3, checkpoint_dir=checkpoint_dir, resume=True)
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    # ids of rows failed once
+    failed = set()
+
+    def do_GET(self):
+        key = self.path.strip('/')
+        if key.startswith('flaky') and key not in self.failed:
+            self.failed.add(key)
+            self.send_response(500)
+            self.end_headers()
+            return
+        time.sleep(0.2)
+        body = key.upper().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+async def _http_get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode('utf-8'))
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    if b' 200 ' not in head.split(b'\r\n', 1)[0]:
+        raise IOError(head.split(b'\r\n', 1)[0].decode('utf-8'))
+    return body.decode('utf-8')
+
+class EnrichProcessor(feilian.AsyncDataframeProcessor):
+    def __init__(self, port, **kwargs):
+        super().__init__(row_format='dict', **kwargs)
+        self.port = port
+
+    async def process_row(self, i, row):
+        return {'key': row['key'], 'value': await _http_get(self.port, f"/{row['key']}")}
+
+def test_async_processor():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        keys = [f"k{i}" for i in range(18)] + ['flaky1', 'flaky2']
+        df = pd.DataFrame({'key': keys})
+        start = time.perf_counter()
+        res = EnrichProcessor(port, concurrency=10, retries=1, retry_delay=0.01).process(df)
+        # 20 rows in 2 rounds, instead of 4 seconds one by one
+        assert time.perf_counter() - start < 2
+        assert res['value'].tolist() == [x.upper() for x in keys]
+        _StubHandler.failed.clear()
+        with pytest.raises(IOError):
+            EnrichProcessor(port, concurrency=10).process(df)
+        with pytest.raises(asyncio.TimeoutError):
+            EnrichProcessor(port, timeout=0.05).process(df.head(1))
+    finally:
+        server.shutdown()
+        server.server_close()
+    with pytest.raises(NotImplementedError, match='process_row'):
+        feilian.AsyncDataframeProcessor().process(pd.DataFrame({'key': ['k1']}))